@@ -0,0 +1,91 @@
+"""Benchmark create_pdf: render time and peak RSS by document length.
+
+Each (canvas, size) pair renders in a fresh forked process so peak RSS is
+not polluted by earlier runs. "snapshot" is the previous NumberedCanvas,
+which kept a copy of every page's state until save().
+
+    python benchmarks/bench_pdf.py --pages 10 100 500
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab.pdfgen import canvas
+
+from services.pdf_generator import NumberedCanvas, create_pdf
+
+PARAGRAPHS_PER_PAGE = 12  # create_pdf breaks the page every 12 paragraphs
+
+
+class SnapshotNumberedCanvas(NumberedCanvas):
+    """The original page-state-snapshot approach, for comparison"""
+
+    def __init__(self, *args, **kwargs):
+        NumberedCanvas.__init__(self, *args, **kwargs)
+        self._pages = []
+
+    def showPage(self):
+        self._pages.append(dict(self.__dict__))
+        self._startPage()
+
+    def save(self):
+        page_count = len(self._pages)
+        for page_num, page in enumerate(self._pages, 1):
+            self.__dict__.update(page)
+            self.draw_page_decorations(page_num)
+            canvas.Canvas.showPage(self)
+        NumberedCanvas.save(self)
+
+
+CANVASES = {"form": NumberedCanvas, "snapshot": SnapshotNumberedCanvas}
+
+
+def synthetic_notes(pages: int) -> dict:
+    paragraph = " ".join(["the eigenvalues of a symmetric matrix are real"] * 6)
+    return {
+        "full_transcription": [paragraph] * (pages * PARAGRAPHS_PER_PAGE),
+        "summary": {"paragraph": paragraph},
+    }
+
+
+def max_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def render(kind: str, pages: int, queue):
+    notes = synthetic_notes(pages)
+    before = max_rss_mb()
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        create_pdf(notes, os.path.join(tmp, "bench.pdf"), "bench.mp4", canvasmaker=CANVASES[kind])
+        elapsed = time.perf_counter() - start
+    queue.put((elapsed, max_rss_mb(), max_rss_mb() - before))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--canvas", choices=list(CANVASES), nargs="+", default=list(CANVASES))
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("fork")
+    print(f"{'canvas':>9} {'pages':>6} {'time':>9} {'peak RSS':>10} {'growth':>9}")
+    for pages in args.pages:
+        for kind in args.canvas:
+            queue = ctx.Queue()
+            proc = ctx.Process(target=render, args=(kind, pages, queue))
+            proc.start()
+            elapsed, peak, growth = queue.get()
+            proc.join()
+            print(f"{kind:>9} {pages:>6} {elapsed:>8.2f}s {peak:>8.1f}MB {growth:>7.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""End-to-end pipeline benchmark: per-stage latency, throughput and peak memory.
+
+Synthetic lectures (voiced tone bursts separated by pauses) are generated
+once per duration as WAV, MP3 and MP4 fixtures. Each stage is then run on
+them in a fresh forked process, so every run starts from the same state and
+its peak RSS belongs to that stage alone:
+
+    extract     extract_audio_from_video on the MP4 (ffmpeg)
+    convert     convert_to_wav on the MP3
+    transcribe  transcribe_audio on the 16 kHz mono WAV
+    summarize   summarize_text on a transcript of matching length
+    pdf         create_pdf on the summarized notes
+
+Transcription uses the deterministic stub recognizer unless
+--recognizer vosk is given (that needs the models under models/).
+Throughput is seconds of lecture processed per wall-clock second.
+
+    python benchmarks/bench_pipeline.py --durations 60 600 --repeat 5 --save base.json
+    python benchmarks/bench_pipeline.py --durations 60 600 --repeat 5 --compare base.json
+
+With --compare the exit status is 1 if any stage's p50 latency or peak
+memory grew by more than --threshold (default 10%); slowdowns under
+--min-delta seconds are treated as timer noise.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+STAGES = ["extract", "convert", "transcribe", "summarize", "pdf"]
+SOURCE_RATE = 44100
+WORDS_PER_MINUTE = 150
+
+
+# ─────────────────────────────────────────────
+# Fixtures
+# ─────────────────────────────────────────────
+def synthesize_lecture(path: str, seconds: int, seed: int = 0):
+    """Stereo 44.1 kHz WAV: 2-8 s voiced phrases with 0.3-1 s pauses"""
+    rng = np.random.default_rng(seed)
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(2)
+        wf.setsampwidth(2)
+        wf.setframerate(SOURCE_RATE)
+
+        written = 0
+        total = seconds * SOURCE_RATE
+        while written < total:
+            phrase = int(rng.uniform(2, 8) * SOURCE_RATE)
+            pause = int(rng.uniform(0.3, 1.0) * SOURCE_RATE)
+            t = np.arange(phrase) / SOURCE_RATE
+
+            # A few harmonics of a gliding pitch, shaped into ~4 Hz syllables
+            pitch = rng.uniform(110, 220) * (1 + 0.1 * np.sin(2 * np.pi * 0.5 * t))
+            phase = 2 * np.pi * np.cumsum(pitch) / SOURCE_RATE
+            voiced = sum(np.sin(k * phase) / k for k in range(1, 5))
+            envelope = np.abs(np.sin(np.pi * 4 * t)) ** 0.5
+            signal = np.concatenate([voiced * envelope * 6000, np.zeros(pause)])
+            signal += rng.normal(0, 30, len(signal))
+
+            signal = signal[:total - written].astype("<i2")
+            wf.writeframes(np.repeat(signal, 2).tobytes())
+            written += len(signal)
+
+
+def _ffmpeg(*args: str):
+    subprocess.run(["ffmpeg", "-y", "-loglevel", "error", *args], check=True)
+
+
+def build_fixtures(directory: str, seconds: int) -> dict:
+    """Create (or reuse) the fixture set for one duration"""
+    base = os.path.join(directory, f"lecture-{seconds}s")
+    paths = {
+        "source": base + ".wav",
+        "mp3": base + ".mp3",
+        "mp4": base + ".mp4",
+        "wav16k": base + "-16k.wav",
+    }
+    if not os.path.exists(paths["source"]):
+        print(f"🔊 Generating {seconds}s fixtures...")
+        synthesize_lecture(paths["source"], seconds, seed=seconds)
+    if not os.path.exists(paths["mp3"]):
+        _ffmpeg("-i", paths["source"], "-b:a", "128k", paths["mp3"])
+    if not os.path.exists(paths["mp4"]):
+        _ffmpeg("-f", "lavfi", "-i", "color=c=black:s=320x240:r=5", "-i", paths["source"],
+                "-shortest", "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", paths["mp4"])
+    if not os.path.exists(paths["wav16k"]):
+        _ffmpeg("-i", paths["source"], "-ac", "1", "-ar", "16000", paths["wav16k"])
+    return paths
+
+
+def synthetic_transcript(seconds: int, seed: int = 0) -> str:
+    """Unpunctuated lowercase words at lecture pace, like recognizer output"""
+    from services.stub_recognizer import VOCABULARY
+
+    rng = random.Random(seed)
+    vocab = list(VOCABULARY) + [f"term{i}" for i in range(2000)]
+    weights = [1.0 / (i + 1) for i in range(len(vocab))]
+    count = seconds * WORDS_PER_MINUTE // 60
+    return " ".join(rng.choices(vocab, weights=weights, k=count))
+
+
+# ─────────────────────────────────────────────
+# Stage runners (each called in a forked child)
+# ─────────────────────────────────────────────
+def _staged_copy(src: str, workdir: str) -> str:
+    """Stages write their output next to the input, so work on a copy"""
+    dst = os.path.join(workdir, os.path.basename(src))
+    shutil.copyfile(src, dst)
+    return dst
+
+
+def run_stage(stage: str, fixtures: dict, inputs: dict, workdir: str, workers: int):
+    if stage == "extract":
+        from services.video_utils import extract_audio_from_video
+        extract_audio_from_video(_staged_copy(fixtures["mp4"], workdir))
+    elif stage == "convert":
+        from services.audio_utils import convert_to_wav
+        convert_to_wav(_staged_copy(fixtures["mp3"], workdir))
+    elif stage == "transcribe":
+        from services.speech_to_text import transcribe_audio
+        transcribe_audio(fixtures["wav16k"], workers)
+    elif stage == "summarize":
+        from services.summarizer import summarize_text
+        summarize_text(inputs["transcript"])
+    elif stage == "pdf":
+        from services.pdf_generator import create_pdf
+        create_pdf(inputs["notes"], os.path.join(workdir, "bench.pdf"), "bench.mp4")
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux; children covers the ffmpeg subprocesses
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) / 1024
+
+
+def _measure(stage, fixtures, inputs, workers, queue):
+    with open(os.devnull, "w") as devnull, tempfile.TemporaryDirectory() as workdir:
+        stdout, sys.stdout = sys.stdout, devnull  # silence the stages' progress prints
+        try:
+            start = time.perf_counter()
+            run_stage(stage, fixtures, inputs, workdir, workers)
+            elapsed = time.perf_counter() - start
+        finally:
+            sys.stdout = stdout
+    queue.put((elapsed, _peak_rss_mb()))
+
+
+def measure(stage: str, fixtures: dict, inputs: dict, workers: int):
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_measure, args=(stage, fixtures, inputs, workers, queue))
+    proc.start()
+    proc.join()
+    if proc.exitcode != 0:
+        raise RuntimeError(f"{stage} benchmark failed (exit code {proc.exitcode})")
+    return queue.get()
+
+
+# ─────────────────────────────────────────────
+# Reporting
+# ─────────────────────────────────────────────
+def summarize_runs(seconds: int, timings: list, peaks: list) -> dict:
+    timings = np.array(timings)
+    return {
+        "seconds": seconds,
+        "runs": len(timings),
+        "p50": float(np.percentile(timings, 50)),
+        "p95": float(np.percentile(timings, 95)),
+        "max": float(timings.max()),
+        "throughput": seconds / float(np.percentile(timings, 50)),
+        "peak_mb": max(peaks),
+    }
+
+
+def print_table(results: dict):
+    print(f"{'stage':>10} {'audio':>7} {'p50':>9} {'p95':>9} {'max':>9} {'x realtime':>11} {'peak RSS':>10}")
+    for key, r in results.items():
+        stage = key.split("@")[0]
+        print(f"{stage:>10} {r['seconds']:>6}s {r['p50']:>8.3f}s {r['p95']:>8.3f}s {r['max']:>8.3f}s "
+              f"{r['throughput']:>10.1f}x {r['peak_mb']:>8.1f}MB")
+
+
+def compare(results: dict, baseline: dict, threshold: float, min_delta: float) -> int:
+    """Print the change against a saved run; return the number of regressions"""
+    regressions = 0
+    print(f"\n{'stage':>10} {'audio':>7} {'p50 then':>9} {'p50 now':>9} {'change':>8} {'RSS change':>11}")
+    for key, now in results.items():
+        then = baseline["results"].get(key)
+        if not then:
+            continue
+        time_change = now["p50"] / then["p50"] - 1
+        rss_change = now["peak_mb"] / then["peak_mb"] - 1
+        flag = ""
+        slower = time_change > threshold and now["p50"] - then["p50"] > min_delta
+        if slower or rss_change > threshold:
+            regressions += 1
+            flag = "  ⚠️ regression"
+        stage = key.split("@")[0]
+        print(f"{stage:>10} {now['seconds']:>6}s {then['p50']:>8.3f}s {now['p50']:>8.3f}s "
+              f"{time_change:>+7.1%} {rss_change:>+10.1%}{flag}")
+
+    return regressions
+
+
+def _setup(meta: dict) -> dict:
+    return {k: v for k, v in meta.items() if k != "created_at"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--durations", type=int, nargs="+", default=[60, 300])
+    parser.add_argument("--stages", choices=STAGES, nargs="+", default=STAGES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--recognizer", choices=["stub", "vosk"], default="stub")
+    parser.add_argument("--workers", type=int, default=1, help="ASR workers for transcribe")
+    parser.add_argument("--fixtures", default=os.path.join(tempfile.gettempdir(), "noteify-bench"))
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="JSON file from an earlier --save")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    parser.add_argument("--min-delta", type=float, default=0.02,
+                        help="ignore slowdowns smaller than this many seconds (timer noise)")
+    args = parser.parse_args()
+
+    # Must be set before services.speech_to_text is first imported
+    os.environ["NOTEIFY_ASR_BACKEND"] = args.recognizer
+    os.makedirs(args.fixtures, exist_ok=True)
+
+    from services.summarizer import SUMMARY_MODE, summarize_text
+
+    results = {}
+    for seconds in args.durations:
+        fixtures = build_fixtures(args.fixtures, seconds)
+        transcript = synthetic_transcript(seconds, seed=seconds)
+        inputs = {"transcript": transcript, "notes": summarize_text(transcript)}
+
+        for stage in args.stages:
+            try:
+                runs = [measure(stage, fixtures, inputs, args.workers) for _ in range(args.repeat)]
+            except RuntimeError as e:
+                print(f"⚠️ Skipping {stage}@{seconds}: {e}")
+                continue
+            results[f"{stage}@{seconds}"] = summarize_runs(
+                seconds, [t for t, _ in runs], [p for _, p in runs]
+            )
+
+    print_table(results)
+
+    report = {
+        "meta": {
+            "recognizer": args.recognizer,
+            "workers": args.workers,
+            "summary_mode": SUMMARY_MODE,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Saved results to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if _setup(baseline["meta"]) != _setup(report["meta"]):
+            print(f"\n⚠️ Baseline was recorded with a different setup: {_setup(baseline['meta'])}")
+        regressions = compare(results, baseline, args.threshold, args.min_delta)
+        if regressions:
+            print(f"\n❌ {regressions} regression(s) above {args.threshold:.0%}")
+            sys.exit(1)
+        print(f"\n✅ No regressions above {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
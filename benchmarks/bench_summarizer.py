@@ -0,0 +1,69 @@
+"""Micro-benchmark: classic per-sentence scorer vs the vectorized engine.
+
+Generates synthetic lecture-like transcripts of increasing length and times
+extract_summary_paragraph in each mode.
+
+    python benchmarks/bench_summarizer.py --sentences 500 2000 10000
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.summarizer import STOPWORDS, extract_summary_paragraph
+
+MODES = ["classic", "frequency", "tfidf", "textrank"]
+
+
+def synthetic_transcript(n_sentences: int, seed: int = 0) -> str:
+    """Zipf-ish vocabulary with stopwords mixed in, 4-30 words per sentence"""
+    rng = random.Random(seed)
+    vocab = [f"term{i}" for i in range(5000)]
+    cum_weights = list(itertools.accumulate(1.0 / (i + 1) for i in range(len(vocab))))
+    stopwords = sorted(STOPWORDS)
+
+    sentences = []
+    for _ in range(n_sentences):
+        length = rng.randint(4, 30)
+        words = [
+            rng.choice(stopwords) if rng.random() < 0.35 else rng.choices(vocab, cum_weights=cum_weights)[0]
+            for _ in range(length)
+        ]
+        sentences.append(" ".join(words).capitalize() + ".")
+    return " ".join(sentences)
+
+
+def time_mode(text: str, mode: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        extract_summary_paragraph(text, mode)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sentences", type=int, nargs="+", default=[500, 2000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'sentences':>10} " + " ".join(f"{m:>12}" for m in MODES) + f" {'speedup':>9}")
+    for n in args.sentences:
+        text = synthetic_transcript(n)
+        timings = {mode: time_mode(text, mode, args.repeat) for mode in MODES}
+
+        same = extract_summary_paragraph(text, "classic") == extract_summary_paragraph(text, "frequency")
+        speedup = timings["classic"] / timings["tfidf"]
+        print(
+            f"{n:>10} " + " ".join(f"{timings[m] * 1000:>10.1f}ms" for m in MODES)
+            + f" {speedup:>8.1f}x" + ("" if same else "  (frequency != classic!)")
+        )
+
+
+if __name__ == "__main__":
+    main()
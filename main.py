@@ -1,16 +1,39 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, Request, WebSocket
+from fastapi.websockets import WebSocketDisconnect
+from starlette.requests import ClientDisconnect
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+from typing import List, Optional
+from urllib.parse import quote
+import asyncio
+import hashlib
+import json
 import os
-import shutil
+import threading
+import time
 import traceback
 
-from services.audio_utils import convert_to_wav
-from services.video_utils import extract_audio_from_video
-from services.speech_to_text import transcribe_audio
-from services.summarizer import summarize_text
-from services.pdf_generator import create_pdf
+from services.batch import BATCH_MAX_FILES, BatchManager
+from services.cache import CACHE_ENABLED, ResultCache
+from services.exporters import EXPORT_FORMATS, export
+from services.jobs import JobManager
+from services.live import MAX_PCM_RATE, MIN_PCM_RATE, LiveSession
+from services.metrics import ADMISSION_LOAD, CACHE_LOOKUPS, JOBS, REGISTRY, Trace
+from services.outputs import load_notes
+from services.pipeline import (
+    PipelineError,
+    check_tier,
+    pipeline_cache_key,
+    run_pipeline,
+    run_streaming_pipeline,
+    run_text_pipeline,
+)
+from services.search import SEARCH_ENABLED, SEARCH_MAX_RESULTS, SearchIndex
+from services.speech_to_text import ASR_WORKERS, DEFAULT_TIER, MODEL_LOAD, model_status, start_pool, warm_models
+from services.static_site import StaticSite
+from services.uploads import UploadManager
+from services.workspace import SWEEP_INTERVAL_SECONDS, Workspaces, is_output_id
 
 # ─────────────────────────────────────────────
 # App Initialization
@@ -32,113 +55,215 @@ app.add_middleware(
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 UPLOAD_DIR = os.path.join(BASE_DIR, "uploads")
 STATIC_DIR = os.path.join(BASE_DIR, "static")
+CACHE_DIR = os.getenv("NOTEIFY_CACHE_DIR", os.path.join(BASE_DIR, "cache"))
+SEARCH_DB = os.getenv("NOTEIFY_SEARCH_DB", os.path.join(BASE_DIR, "index", "search.db"))
 
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+result_cache = ResultCache(CACHE_DIR) if CACHE_ENABLED else None
+search_index = SearchIndex(SEARCH_DB) if SEARCH_ENABLED else None
 
-AUDIO_FORMATS = {".mp3", ".wav", ".m4a", ".aac"}
-VIDEO_FORMATS = {".mp4", ".avi", ".mov", ".mkv", ".webm"}
+# Outputs live in UPLOAD_DIR under unique ids; each job gets its own scratch
+# directory for intermediates (see services/workspace.py)
+workspaces = Workspaces(UPLOAD_DIR, index=search_index)
 
-# ─────────────────────────────────────────────
-# Serve Frontend (React build)
-# ─────────────────────────────────────────────
-if os.path.exists(STATIC_DIR):
-    app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+# Worker pool shared by /api/process and the job API (see services/jobs.py)
+job_manager = JobManager(cache=result_cache, index=search_index)
+batch_manager = BatchManager(job_manager)
+upload_manager = UploadManager(job_manager, workspaces, UPLOAD_DIR)
 
-    @app.get("/")
-    def serve_frontend():
-        return FileResponse(os.path.join(STATIC_DIR, "index.html"))
 
-    # React Router support (important!)
-    @app.get("/{path:path}")
-    def serve_react_routes(path: str):
-        file_path = os.path.join(STATIC_DIR, path)
-        if os.path.exists(file_path):
-            return FileResponse(file_path)
-        return FileResponse(os.path.join(STATIC_DIR, "index.html"))
+@app.on_event("startup")
+def start_model_load():
+    # The parallel-ASR pool is forked once the models are in memory, so its
+    # workers share them; serve.py workers each fork their own here
+    if MODEL_LOAD == "background":
+        def load():
+            try:
+                warm_models()
+                print("✅ Speech model loaded")
+                if ASR_WORKERS > 1:
+                    start_pool()
+            except Exception:
+                print("❌ Speech model failed to load")
+                print(traceback.format_exc())
 
-else:
-    # Fallback if frontend is not built
-    @app.get("/")
-    def root():
-        return {
-            "status": "running",
-            "service": "Noteify AI Backend",
-            "message": "Frontend not built yet"
-        }
+        threading.Thread(target=load, name="noteify-model-load", daemon=True).start()
+    elif MODEL_LOAD == "eager" and ASR_WORKERS > 1:
+        start_pool()
+
+
+@app.on_event("startup")
+async def start_sweeper():
+    async def sweep_forever():
+        while True:
+            try:
+                await asyncio.to_thread(workspaces.sweep)
+                upload_manager.prune()
+            except Exception:
+                print("❌ Output sweep failed")
+                print(traceback.format_exc())
+            await asyncio.sleep(SWEEP_INTERVAL_SECONDS)
+
+    app.state.sweeper = asyncio.create_task(sweep_forever())
+
+
+@app.on_event("startup")
+def backfill_search_index():
+    if search_index:
+        def backfill():
+            try:
+                added = search_index.backfill(UPLOAD_DIR)
+                if added:
+                    print(f"🔎 Indexed {added} earlier transcripts")
+            except Exception:
+                print("❌ Search index backfill failed")
+                print(traceback.format_exc())
+
+        threading.Thread(target=backfill, name="noteify-index-backfill", daemon=True).start()
+
+
+@app.on_event("shutdown")
+def shutdown_workers():
+    app.state.sweeper.cancel()
+    job_manager.shutdown()
+
+
+def save_upload(file: UploadFile, input_path: str) -> str:
+    """Write the upload to disk and return its SHA-256 (the cache key)"""
+    digest = hashlib.sha256()
+    with open(input_path, "wb") as buffer:
+        while True:
+            chunk = file.file.read(1024 * 1024)
+            if not chunk:
+                break
+            digest.update(chunk)
+            buffer.write(chunk)
+    return digest.hexdigest()
 
 # ─────────────────────────────────────────────
 # Main Processing Endpoint - FULL TRANSCRIPTION
 # ─────────────────────────────────────────────
 @app.post("/api/process")
-async def process_lecture(file: UploadFile = File(...)):
+async def process_lecture(file: UploadFile = File(...), tier: str = DEFAULT_TIER):
     if not file.filename:
         raise HTTPException(status_code=400, detail="No file uploaded")
 
-    filename = file.filename.lower()
-    file_ext = os.path.splitext(filename)[1]
-    input_path = os.path.join(UPLOAD_DIR, filename)
+    filename = os.path.basename(file.filename).lower()
 
-    with open(input_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    with Trace("/api/process", tier) as trace, workspaces.create() as workspace:
+        input_path = workspace.path(filename)
+        content_hash = await run_in_threadpool(save_upload, file, input_path)
 
-    audio_path = None
-    wav_path = None
+        try:
+            print(f"📁 Received file: {filename}")
+            return await run_pipeline(
+                job_manager.executor, input_path, filename, UPLOAD_DIR,
+                cache=result_cache, content_hash=content_hash, tier=tier,
+                renderer=job_manager.renderer, trace=trace, output_id=workspace.id,
+                index=search_index, admission=job_manager.admission
+            )
 
-    try:
-        print(f"📁 Received file: {filename}")
-
-        if file_ext in VIDEO_FORMATS:
-            print("🎥 Extracting audio from video...")
-            audio_path = extract_audio_from_video(input_path)
-        elif file_ext in AUDIO_FORMATS:
-            print("🎵 Processing audio file...")
-            audio_path = input_path
-        else:
+        except PipelineError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers)
+        except Exception as e:
+            print("❌ Error occurred")
+            print(traceback.format_exc())
             raise HTTPException(
-                status_code=400,
-                detail=f"Unsupported file format: {file_ext}"
+                status_code=500,
+                detail=f"Processing failed: {str(e)}"
             )
 
-        print("🔄 Converting to WAV...")
-        wav_path = convert_to_wav(audio_path)
+# ─────────────────────────────────────────────
+# Streaming Endpoint - raw request body piped into ffmpeg as it arrives
+# ─────────────────────────────────────────────
+@app.post("/api/process/stream")
+async def process_lecture_stream(request: Request, filename: str, tier: str = DEFAULT_TIER):
+    filename = os.path.basename(filename).lower()
+    if not filename:
+        raise HTTPException(status_code=400, detail="No file uploaded")
+    size = request.headers.get("content-length")
 
-        print("🎙️ Transcribing audio...")
-        transcription_text = transcribe_audio(wav_path)
+    with Trace("/api/process/stream", tier) as trace:
+        try:
+            print(f"📁 Streaming file: {filename}")
+            return await run_streaming_pipeline(
+                job_manager.executor, request.stream(), filename, UPLOAD_DIR,
+                cache=result_cache, tier=tier, renderer=job_manager.renderer, trace=trace,
+                index=search_index, admission=job_manager.admission,
+                size=int(size) if size and size.isdigit() else None
+            )
 
-        if not transcription_text.strip():
+        except PipelineError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers)
+        except Exception as e:
+            print("❌ Error occurred")
+            print(traceback.format_exc())
             raise HTTPException(
-                status_code=400,
-                detail="No speech detected in the audio"
+                status_code=500,
+                detail=f"Processing failed: {str(e)}"
             )
 
-        print("📚 Generating structured summary...")
-        notes_data = summarize_text(transcription_text)
+# ─────────────────────────────────────────────
+# Resumable Uploads - chunks are appended in order (and hashed) as they
+# arrive; a dropped chunk is resumed from GET .../{id}'s offset.
+#   POST   /api/uploads?filename=&size=[&sha256=]   start
+#   PUT    /api/uploads/{id}?offset=N               append raw bytes
+#   GET    /api/uploads/{id}                        current offset
+#   POST   /api/uploads/{id}/finalize[?sha256=]     verify and process
+# ─────────────────────────────────────────────
+def _get_upload(upload_id: str):
+    session = upload_manager.get(upload_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return session
 
-        pdf_filename = os.path.splitext(filename)[0] + ".pdf"
-        pdf_path = os.path.join(UPLOAD_DIR, pdf_filename)
 
-        print("📄 Creating professional PDF...")
-        create_pdf(notes_data, pdf_path, filename)
+@app.post("/api/uploads", status_code=201)
+async def create_upload(filename: str, size: int, sha256: str = None, tier: str = DEFAULT_TIER):
+    filename = os.path.basename(filename).lower()
+    if not filename:
+        raise HTTPException(status_code=400, detail="No file uploaded")
 
-        full_transcription = " ".join(notes_data["full_transcription"])
-        summary = notes_data["summary"]["paragraph"].strip()
+    try:
+        session = upload_manager.create(filename, size, sha256, tier)
+    except PipelineError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers)
 
-        summary = summary.rstrip('.').rstrip('…').rstrip('...').strip()
-        if not summary.endswith(('.', '!', '?')):
-            summary += '.'
+    print(f"📁 Upload {session.id} started: {filename} ({size} bytes)")
+    return session.to_dict()
 
-        return {
-            "success": True,
-            "filename": filename,
-            "output": {
-                "full_transcription": full_transcription,
-                "summary_paragraph": summary
-            },
-            "pdf_url": f"/api/download/{pdf_filename}"
-        }
 
-    except HTTPException:
-        raise
+@app.get("/api/uploads/{upload_id}")
+def get_upload(upload_id: str):
+    return _get_upload(upload_id).to_dict()
+
+
+@app.put("/api/uploads/{upload_id}")
+async def upload_chunk(upload_id: str, request: Request, offset: int):
+    session = _get_upload(upload_id)
+    try:
+        await session.write(offset, request.stream())
+    except PipelineError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers)
+    except ClientDisconnect:
+        # What arrived is kept; the client resumes from the stored offset
+        return Response(status_code=499)
+    return {"offset": session.offset, "complete": session.complete}
+
+
+@app.delete("/api/uploads/{upload_id}", status_code=204)
+def cancel_upload(upload_id: str):
+    upload_manager.discard(_get_upload(upload_id))
+
+
+@app.post("/api/uploads/{upload_id}/finalize")
+async def finalize_upload(upload_id: str, sha256: str = None):
+    session = _get_upload(upload_id)
+    try:
+        print(f"📁 Finalizing upload {session.id}: {session.filename}")
+        return await upload_manager.finalize(session, sha256)
+
+    except PipelineError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers)
     except Exception as e:
         print("❌ Error occurred")
         print(traceback.format_exc())
@@ -146,26 +271,372 @@ async def process_lecture(file: UploadFile = File(...)):
             status_code=500,
             detail=f"Processing failed: {str(e)}"
         )
+
+# ─────────────────────────────────────────────
+# Live Transcription - WebSocket with partial results
+# Client sends binary audio chunks, then the text message "end".
+# ─────────────────────────────────────────────
+@app.websocket("/ws/transcribe")
+async def live_transcription(
+    websocket: WebSocket,
+    encoding: str = "pcm",
+    rate: int = 16000,
+    filename: str = "live-lecture.wav",
+    tier: str = DEFAULT_TIER
+):
+    await websocket.accept()
+    filename = os.path.basename(filename).lower() or "live-lecture.wav"
+
+    admission = job_manager.admission
+    try:
+        check_tier(tier)
+        if not MIN_PCM_RATE <= rate <= MAX_PCM_RATE:
+            raise PipelineError(400, f"Sample rate must be between {MIN_PCM_RATE} and {MAX_PCM_RATE} Hz")
+        # A live session recognizes for as long as it is connected; it
+        # cannot queue, so it is refused (1013 "try again later") when busy
+        ticket = await admission.acquire(admission.estimate_live(tier), 0)
+    except PipelineError as e:
+        error = {"type": "error", "status_code": e.status_code, "detail": e.detail}
+        if e.headers and "Retry-After" in e.headers:
+            error["retry_after"] = int(e.headers["Retry-After"])
+        await websocket.send_json(error)
+        await websocket.close(code=1013 if e.status_code == 429 else 1008)
+        return
+
+    try:
+        session = await LiveSession.open(encoding, rate, tier)
+    except BaseException:
+        admission.release(ticket)
+        raise
+
+    async def forward_events():
+        async for event in session.events():
+            await websocket.send_json(event)
+
+    forwarder = asyncio.create_task(forward_events())
+    trace = Trace("/ws/transcribe", tier)
+    status = 200
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes"):
+                await session.feed(message["bytes"])
+            elif message.get("text") == "end":
+                break
+
+        segments = await session.finish()
+        await forwarder
+
+        print(f"📁 Live session finished: {filename}")
+        recognizer = session.recognizer
+        trace.set(audio_seconds=round(recognizer.position / recognizer.rate, 2))
+        result = await run_text_pipeline(
+            job_manager.executor, segments, filename, UPLOAD_DIR,
+            renderer=job_manager.renderer, trace=trace, index=search_index
+        )
+        await websocket.send_json({"type": "final", **result})
+        await websocket.close()
+
+    except WebSocketDisconnect:
+        status = 499  # client went away
+    except PipelineError as e:
+        status = e.status_code
+        await websocket.send_json({"type": "error", "status_code": e.status_code, "detail": e.detail})
+        await websocket.close()
+    except Exception as e:
+        print("❌ Error occurred")
+        print(traceback.format_exc())
+        status = 500
+        await websocket.send_json({"type": "error", "status_code": 500, "detail": f"Processing failed: {str(e)}"})
+        await websocket.close()
     finally:
-        for path in [input_path, audio_path, wav_path]:
-            try:
-                if path and os.path.exists(path):
-                    os.remove(path)
-            except Exception:
-                pass
+        forwarder.cancel()
+        session.close()
+        admission.release(ticket)
+        trace.finish(status)
+
+# ─────────────────────────────────────────────
+# Job API - returns immediately, pipeline runs on the worker pool
+# ─────────────────────────────────────────────
+@app.post("/api/jobs", status_code=202)
+async def create_job(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    tier: str = DEFAULT_TIER
+):
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="No file uploaded")
+
+    try:
+        check_tier(tier)
+    except PipelineError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers)
+
+    filename = os.path.basename(file.filename).lower()
+    job = job_manager.create(filename, tier)
+    workspace = workspaces.create(job.id)
+    input_path = workspace.path(filename)
+
+    try:
+        content_hash = await run_in_threadpool(save_upload, file, input_path)
+        # A cached result is free: it is neither probed nor turned away
+        duration = None
+        cached = result_cache is not None and await run_in_threadpool(
+            result_cache.contains, pipeline_cache_key(content_hash, tier)
+        )
+        if not cached:
+            cost = await run_in_threadpool(job_manager.admission.estimate, filename, tier, input_path)
+            job_manager.admission.check(cost)
+            duration = cost.duration
+    except PipelineError as e:
+        job_manager.discard(job)
+        workspace.close()
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers)
+    except Exception:
+        job_manager.discard(job)
+        workspace.close()
+        raise
+
+    print(f"📁 Queued job {job.id} for file: {filename}")
+    # The estimate already measured the input; the pipeline reuses that
+    background_tasks.add_task(job_manager.run, job, input_path, UPLOAD_DIR, content_hash, workspace,
+                              duration)
+
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/api/jobs/{job.id}",
+        "result_url": f"/api/jobs/{job.id}/result"
+    }
+
+
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@app.get("/api/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status == "failed":
+        raise HTTPException(status_code=job.error["status_code"], detail=job.error["detail"])
+    if job.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    return job.result
+
+# ─────────────────────────────────────────────
+# Batch API - many files in one request, results streamed as NDJSON
+# ─────────────────────────────────────────────
+@app.post("/api/batch")
+async def create_batch(files: List[UploadFile] = File(...), tier: str = DEFAULT_TIER):
+    if not files:
+        raise HTTPException(status_code=400, detail="No file uploaded")
+    if len(files) > BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_FILES} files per batch")
+
+    try:
+        check_tier(tier)
+    except PipelineError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers)
+
+    batch = batch_manager.create(tier)
+    for i, file in enumerate(files):
+        filename = os.path.basename(file.filename or "").lower() or f"file-{i}"
+        workspace = workspaces.create()
+        input_path = workspace.path(filename)
+        content_hash = await run_in_threadpool(save_upload, file, input_path)
+        batch.add(filename, workspace, input_path, content_hash)
+
+    print(f"📁 Batch {batch.id}: {len(files)} files")
+    batch_manager.start(batch, UPLOAD_DIR)
+
+    async def manifest():
+        async for entry in batch_manager.manifest(batch):
+            yield json.dumps(entry) + "\n"
+
+    return StreamingResponse(manifest(), media_type="application/x-ndjson")
+
+
+@app.get("/api/batch/{batch_id}")
+def get_batch(batch_id: str):
+    batch = batch_manager.get(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return batch.to_dict()
+
+
+@app.get("/api/batch/{batch_id}/zip")
+async def download_batch_zip(batch_id: str):
+    batch = batch_manager.get(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    if batch.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Batch is {batch.status}")
+
+    zip_path = await batch_manager.build_zip(batch, UPLOAD_DIR)
+    return FileResponse(
+        zip_path,
+        media_type="application/zip",
+        filename=f"noteify-batch-{batch.id}.zip"
+    )
+
+# ─────────────────────────────────────────────
+# Readiness - 503 until the default tier's model is loaded
+# ─────────────────────────────────────────────
+@app.get("/api/ready")
+def readiness():
+    status = model_status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+# ─────────────────────────────────────────────
+# Transcript Search - ranked paragraphs with playback offsets
+# ─────────────────────────────────────────────
+@app.get("/api/search")
+async def search_transcripts(q: str, limit: int = 20, output_id: Optional[str] = None):
+    if not search_index:
+        raise HTTPException(status_code=404, detail="Search is disabled")
+    if not 1 <= limit <= SEARCH_MAX_RESULTS:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {SEARCH_MAX_RESULTS}")
+
+    started = time.perf_counter()
+    results = await run_in_threadpool(search_index.search, q, limit, output_id)
+    return {
+        "query": q,
+        "results": results,
+        "took_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+# ─────────────────────────────────────────────
+# Admission Control Stats - slots in use, queues and learned speeds
+# ─────────────────────────────────────────────
+@app.get("/api/admission/stats")
+def admission_stats():
+    return job_manager.admission.stats()
+
+# ─────────────────────────────────────────────
+# Result Cache Stats
+# ─────────────────────────────────────────────
+@app.get("/api/cache/stats")
+def cache_stats():
+    if not result_cache:
+        return {"enabled": False}
+    return result_cache.stats()
 
 # ─────────────────────────────────────────────
-# PDF Download Endpoint
+# Prometheus Metrics (see services/metrics.py)
 # ─────────────────────────────────────────────
-@app.get("/api/download/{filename}")
-def download_pdf(filename: str):
-    file_path = os.path.join(UPLOAD_DIR, filename)
+@app.get("/metrics")
+def metrics():
+    if result_cache:
+        CACHE_LOOKUPS.set(result_cache.hits, result="hit")
+        CACHE_LOOKUPS.set(result_cache.misses, result="miss")
+    counts = job_manager.counts()
+    for status in ("queued", "running", "completed", "failed"):
+        JOBS.set(counts.get(status, 0), status=status)
+    admission = job_manager.admission.stats()
+    for kind in ("active", "queued_fast", "queued_regular", "memory_mb"):
+        ADMISSION_LOAD.set(admission[kind], kind=kind)
 
-    if not os.path.exists(file_path):
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+# ─────────────────────────────────────────────
+# PDF Download Endpoint - by output id (the job id for /api/jobs)
+# ─────────────────────────────────────────────
+def _download_name(record: dict, output_id: str, ext: str) -> str:
+    """Name the client saves the file as: the original upload's name"""
+    stem = os.path.splitext(record["filename"])[0] if record else output_id
+    return f"{stem or output_id}.{ext}"
+
+
+@app.get("/api/download/{output_id}")
+async def download_pdf(output_id: str):
+    # A trailing ".pdf" is accepted so links can look like files
+    if output_id.endswith(".pdf"):
+        output_id = output_id[:-4]
+    if not is_output_id(output_id):
+        raise HTTPException(status_code=404, detail="PDF not found")
+
+    # Deferred PDFs are rendered (or awaited) here on first download
+    try:
+        file_path = await job_manager.renderer.ensure(UPLOAD_DIR, output_id)
+    except Exception as e:
+        print("❌ Error occurred")
+        print(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Rendering failed: {str(e)}")
+    if not file_path:
         raise HTTPException(status_code=404, detail="PDF not found")
 
+    record = await run_in_threadpool(load_notes, UPLOAD_DIR, output_id)
     return FileResponse(
         file_path,
         media_type="application/pdf",
-        filename=filename
+        filename=_download_name(record, output_id, "pdf")
+    )
+
+# ─────────────────────────────────────────────
+# Lightweight Exports - rendered from the stored notes, no PDF needed
+# ─────────────────────────────────────────────
+@app.get("/api/export/{output_id}/{fmt}")
+async def export_notes(output_id: str, fmt: str):
+    if fmt == "pdf":
+        return await download_pdf(output_id)
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {fmt}")
+
+    record = None
+    if is_output_id(output_id):
+        record = await run_in_threadpool(load_notes, UPLOAD_DIR, output_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Notes not found")
+
+    media_type, ext = EXPORT_FORMATS[fmt]
+    name = _download_name(record, output_id, ext)
+    try:
+        body = export(fmt, record)
+    except Exception as e:
+        print("❌ Error occurred")
+        print(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Rendering failed: {str(e)}")
+    return Response(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename*=utf-8''{quote(name)}"}
     )
+
+# ─────────────────────────────────────────────
+# Serve Frontend (React build, indexed in memory - see services/static_site.py)
+# Registered last so the catch-all route cannot shadow /api/* GET routes.
+# ─────────────────────────────────────────────
+if os.path.exists(STATIC_DIR):
+    static_site = StaticSite(STATIC_DIR)
+
+    @app.get("/static/{path:path}")
+    def serve_static(path: str, request: Request):
+        return static_site.serve(request, path, fallback=None)
+
+    @app.get("/")
+    def serve_frontend(request: Request):
+        return static_site.serve(request, "index.html")
+
+    # React Router support (important!)
+    @app.get("/{path:path}")
+    def serve_react_routes(path: str, request: Request):
+        return static_site.serve(request, path)
+
+else:
+    # Fallback if frontend is not built
+    @app.get("/")
+    def root():
+        return {
+            "status": "running",
+            "service": "Noteify AI Backend",
+            "message": "Frontend not built yet"
+        }
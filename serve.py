@@ -0,0 +1,131 @@
+"""Pre-fork launcher: N uvicorn workers sharing one copy of the speech model.
+
+    python serve.py --workers 4 --port 8000
+
+``uvicorn --workers N`` starts N fresh interpreters that each load their
+own multi-GB Vosk model. Here the master process loads the default tier's
+model once, then forks the workers, which share its pages copy-on-write.
+Each worker imports main.py after the fork, so executors, caches and
+in-memory state are never shared between processes. The master only
+supervises: it restarts workers that die and forwards SIGINT/SIGTERM.
+
+Jobs, batches and resumable uploads are tracked in the memory of the worker
+that created them, so a load balancer in front must route their follow-up
+requests (status polls, chunks) to the same worker. /metrics is per worker too.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+WORKERS = int(os.getenv("NOTEIFY_SERVER_WORKERS", "2"))
+RESTART_DELAY_SECONDS = 1.0
+
+
+def bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _exit_with_master(master_pid: int):
+    """Shut the worker down if the master dies (e.g. SIGKILL) instead of orphaning it"""
+    while os.getppid() == master_pid:
+        time.sleep(1)
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+def run_worker(sock: socket.socket, args, master_pid: int):
+    import uvicorn
+
+    # uvicorn installs its own handlers for graceful shutdown
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    threading.Thread(target=_exit_with_master, args=(master_pid,), daemon=True).start()
+    config = uvicorn.Config("main:app", log_level=args.log_level, timeout_keep_alive=args.keep_alive)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def spawn(sock: socket.socket, args) -> int:
+    master_pid = os.getpid()
+    # Unflushed output would otherwise be printed by both processes
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            run_worker(sock, args, master_pid)
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)
+    return pid
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--keep-alive", type=int, default=5)
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)  # model paths are relative to the project
+
+    from services.speech_to_text import warm_models
+
+    started = time.time()
+    warm_models()
+    print(f"✅ Speech model loaded in {time.time() - started:.1f}s; forking {args.workers} workers")
+
+    sock = bind(args.host, args.port)
+    # Objects that exist now are never collected in the workers, so the
+    # collector does not touch (and copy) the pages they share
+    gc.freeze()
+
+    children = {spawn(sock, args) for _ in range(args.workers)}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    print(f"🚀 Serving on http://{args.host}:{args.port} (master pid {os.getpid()})")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if not stopping:
+            print(f"⚠️ Worker {pid} exited with status {status}; restarting")
+            time.sleep(RESTART_DELAY_SECONDS)
+            if not stopping:
+                children.add(spawn(sock, args))
+
+
+if __name__ == "__main__":
+    main()
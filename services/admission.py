@@ -0,0 +1,322 @@
+"""Admission control in front of the pipeline.
+
+Every run that misses the result cache first asks for a slot. Its cost is
+estimated from the input alone: the WAV header, else ffprobe's duration,
+else the file size at a typical bitrate for its format. Live sessions hold
+a slot for as long as they are connected. The cost is the audio length,
+the memory that length is expected to need, and the processing time
+implied by the tier's measured speed. A run starts when the active count
+and memory estimates stay within budget.
+
+Otherwise it queues, unless the estimated wait exceeds what the caller
+accepts; then it gets a 429 with a Retry-After of that estimate.
+Recordings up to FAST_LANE_SECONDS form a fast lane: they are dispatched
+before longer ones and have FAST_LANE_SLOTS slots that long recordings
+cannot take, so a short clip never waits for hour-long lectures.
+
+Budgets are per process (each serve.py worker admits on its own).
+"""
+import asyncio
+import io
+import math
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from services.audio_utils import WavStream
+from services.metrics import ADMISSION_WAIT_SECONDS, ADMISSIONS
+from services.pipeline import VIDEO_FORMATS, PipelineError
+from services.video_utils import probe_duration
+
+ADMISSION_ENABLED = os.getenv("NOTEIFY_ADMISSION", "1") == "1"
+ADMISSION_MAX_ACTIVE = int(os.getenv("NOTEIFY_ADMISSION_MAX_ACTIVE",
+                                     os.getenv("NOTEIFY_WORKERS", str(os.cpu_count() or 2))))
+ADMISSION_MEMORY_MB = int(os.getenv("NOTEIFY_ADMISSION_MEMORY_MB", "0"))  # 0: half the RAM
+# Longest estimated wait a waiting client (/api/process) is kept queued for,
+# and the longest backlog a background submission (/api/jobs) is accepted into
+ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("NOTEIFY_ADMISSION_MAX_WAIT", "60"))
+ADMISSION_MAX_BACKLOG_SECONDS = float(os.getenv("NOTEIFY_ADMISSION_MAX_BACKLOG", "1800"))
+ADMISSION_QUEUE_LIMIT = int(os.getenv("NOTEIFY_ADMISSION_QUEUE_LIMIT", "100"))
+RETRY_AFTER_MAX_SECONDS = 3600
+
+FAST_LANE_SECONDS = float(os.getenv("NOTEIFY_FAST_LANE_SECONDS", "300"))
+FAST_LANE_SLOTS = int(os.getenv("NOTEIFY_FAST_LANE_SLOTS", "1"))
+
+# Memory: a recognizer and an ffmpeg process per run, plus what grows with
+# the audio (segments and word timings; "refine" also keeps the audio of
+# low-confidence utterances)
+JOB_BASE_MB = float(os.getenv("NOTEIFY_JOB_BASE_MB", "300"))
+MB_PER_AUDIO_MINUTE = {"fast": 0.5, "accurate": 0.5, "refine": 2.5}
+FAST_LANE_JOB_MB = JOB_BASE_MB + FAST_LANE_SECONDS / 60 * max(MB_PER_AUDIO_MINUTE.values())
+
+# Processing seconds per audio second until runs have been measured
+REALTIME_FACTORS = {"fast": 0.15, "accurate": 0.4, "refine": 0.5}
+SPEED_SMOOTHING = 0.2
+SPEED_MIN_AUDIO_SECONDS = 30
+
+# Size-only estimates (uploads not received yet, or probing failed). A WAV
+# without a readable header is taken to be 16 kHz mono, the smallest PCM
+# we expect, so its length is over- rather than underestimated.
+BYTES_PER_SECOND = {
+    ".wav": 32000,    # 16-bit PCM
+    ".mp3": 16000,    # 128 kbit/s
+    ".m4a": 16000,
+    ".aac": 16000,
+}
+VIDEO_BYTES_PER_SECOND = 125000   # 1 Mbit/s
+UNKNOWN_AUDIO_SECONDS = 3600.0
+HEADER_BYTES = 64 * 1024
+
+# Live sessions run in real time and their length is unknown up front
+LIVE_SESSION_SECONDS = float(os.getenv("NOTEIFY_LIVE_SESSION_SECONDS", "3600"))
+
+
+def _physical_memory_mb() -> float:
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (ValueError, OSError, AttributeError):
+        return 4096.0
+
+
+class Cost:
+    def __init__(self, audio_seconds: float, tier: str, source: str):
+        self.audio_seconds = audio_seconds
+        self.tier = tier
+        self.source = source  # "wav", "probe", "size", "unknown" or "live"
+        self.memory_mb = JOB_BASE_MB + audio_seconds / 60 * MB_PER_AUDIO_MINUTE.get(tier, 0.5)
+        self.fast = audio_seconds <= FAST_LANE_SECONDS
+
+    @property
+    def duration(self) -> Optional[float]:
+        """The input's measured length, if it was measured rather than guessed"""
+        return self.audio_seconds if self.source in ("wav", "probe") else None
+
+
+def wav_header_seconds(header: bytes, size: Optional[int] = None) -> Optional[float]:
+    """Length of a WAV from its first bytes (and total ``size`` if the header has none)"""
+    try:
+        stream = WavStream(io.BytesIO(header))
+    except ValueError:
+        return None
+    byte_rate = stream.rate * stream.frame_bytes
+    if not byte_rate:
+        return None
+    if stream.remaining is not None:
+        return stream.remaining / byte_rate
+    if size:
+        return max(size - stream.fp.tell(), 0) / byte_rate
+    return None
+
+
+def estimate_cost(filename: str, tier: str, path: Optional[str] = None,
+                  size: Optional[int] = None, header: Optional[bytes] = None,
+                  duration: Optional[float] = None) -> Cost:
+    """Cost of an input from its already measured ``duration``, its file
+    (``path``), or its byte ``size`` and first bytes (``header``) when it
+    has not been received yet"""
+    file_ext = os.path.splitext(filename)[1]
+    if duration is not None:
+        return Cost(duration, tier, "probe")
+    if path:
+        if file_ext == ".wav":
+            with open(path, "rb") as f:
+                header = f.read(HEADER_BYTES)
+            seconds = wav_header_seconds(header, os.path.getsize(path))
+            if seconds is not None:
+                return Cost(seconds, tier, "wav")
+        duration = probe_duration(path)
+        if duration:
+            return Cost(duration, tier, "probe")
+        size = os.path.getsize(path)
+    elif header and file_ext == ".wav":
+        seconds = wav_header_seconds(header, size)
+        if seconds is not None:
+            return Cost(seconds, tier, "wav")
+
+    if not size:
+        return Cost(UNKNOWN_AUDIO_SECONDS, tier, "unknown")
+    if file_ext in VIDEO_FORMATS:
+        rate = VIDEO_BYTES_PER_SECOND
+    else:
+        rate = BYTES_PER_SECOND.get(file_ext, min(BYTES_PER_SECOND.values()))
+    return Cost(size / rate, tier, "size")
+
+
+class Ticket:
+    def __init__(self, cost: Cost, seconds: float):
+        self.cost = cost
+        self.seconds = seconds  # estimated processing time
+        self.lane = "fast" if cost.fast else "regular"
+        self.queued_at = time.time()
+        self.started_at: Optional[float] = None
+        self.admitted: Optional[asyncio.Future] = None
+
+
+class AdmissionController:
+    """Slots for pipeline runs; used from the event loop only"""
+
+    def __init__(self, max_active: int = ADMISSION_MAX_ACTIVE, memory_mb: float = ADMISSION_MEMORY_MB,
+                 fast_lane_slots: int = FAST_LANE_SLOTS, queue_limit: int = ADMISSION_QUEUE_LIMIT,
+                 enabled: bool = ADMISSION_ENABLED):
+        self.enabled = enabled
+        self.max_active = max(max_active, 1)
+        self.memory_mb = memory_mb or _physical_memory_mb() / 2
+        self.fast_lane_slots = max(min(fast_lane_slots, self.max_active - 1), 0)
+        # Memory only fast-lane runs may use: the most each reserved slot can need
+        self.fast_lane_memory_mb = min(self.fast_lane_slots * FAST_LANE_JOB_MB, self.memory_mb / 2)
+        self.queue_limit = queue_limit
+        self.active: List[Ticket] = []
+        self.queues: Dict[bool, Deque[Ticket]] = {True: deque(), False: deque()}  # by Cost.fast
+        self.speed = dict(REALTIME_FACTORS)
+
+    def estimate(self, filename: str, tier: str, path: Optional[str] = None,
+                 size: Optional[int] = None, header: Optional[bytes] = None,
+                 duration: Optional[float] = None) -> Cost:
+        return estimate_cost(filename, tier, path, size, header, duration)
+
+    def estimate_live(self, tier: str) -> Cost:
+        return Cost(LIVE_SESSION_SECONDS, tier, "live")
+
+    def _ticket(self, cost: Cost) -> Ticket:
+        if cost.source == "live":
+            return Ticket(cost, cost.audio_seconds)  # busy for as long as it is connected
+        return Ticket(cost, cost.audio_seconds * self.speed.get(cost.tier, 0.5))
+
+    def _slots(self, fast: bool) -> int:
+        return self.max_active if fast else self.max_active - self.fast_lane_slots
+
+    def _fits(self, ticket: Ticket) -> bool:
+        if not self.active:
+            return True  # an input over the memory budget still runs, alone
+        if len(self.active) >= self._slots(ticket.cost.fast):
+            return False
+        need = ticket.cost.memory_mb
+        if sum(t.cost.memory_mb for t in self.active) + need > self.memory_mb:
+            return False
+        if ticket.cost.fast:
+            return True
+        # Long runs leave the fast lane's reserve free, whatever it is using
+        regular = sum(t.cost.memory_mb for t in self.active if not t.cost.fast)
+        return regular + need <= self.memory_mb - self.fast_lane_memory_mb
+
+    def _queued_ahead(self, ticket: Ticket) -> List[Ticket]:
+        ahead = list(self.queues[True])
+        if not ticket.cost.fast:
+            ahead += self.queues[False]
+        return ahead
+
+    def estimated_wait(self, ticket: Ticket) -> float:
+        """Seconds until ``ticket`` would start: the work ahead of it spread over its lane's slots.
+
+        A fast-lane ticket at most waits for the fast-lane runs ahead of it
+        to clear the reserved slots.
+        """
+        now = time.time()
+        remaining = [max(t.seconds - (now - t.started_at), 1.0) for t in self.active]
+        queued = sum(t.seconds for t in self._queued_ahead(ticket))
+        wait = (sum(remaining) + queued) / self._slots(ticket.cost.fast)
+        if ticket.cost.fast and self.fast_lane_slots:
+            fast = sum(r for r, t in zip(remaining, self.active) if t.cost.fast)
+            wait = min(wait, (fast + queued) / self.fast_lane_slots)
+        return wait
+
+    def _reject_if_over(self, ticket: Ticket, max_wait: float):
+        queued = len(self.queues[True]) + len(self.queues[False])
+        wait = self.estimated_wait(ticket)
+        if queued < self.queue_limit and wait <= max_wait:
+            return
+        ADMISSIONS.inc(lane=ticket.lane, decision="rejected")
+        retry_after = min(max(math.ceil(wait), 1), RETRY_AFTER_MAX_SECONDS)
+        raise PipelineError(
+            429, f"Server is busy; retry in about {retry_after}s",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    def has_room(self, cost: Cost) -> bool:
+        """Whether a run of this cost would start right away"""
+        ticket = self._ticket(cost)
+        return not self.enabled or (not self._queued_ahead(ticket) and self._fits(ticket))
+
+    def check(self, cost: Cost, max_wait: float = ADMISSION_MAX_BACKLOG_SECONDS):
+        """Reject (429) a submission that would queue too long; takes no slot"""
+        if not self.has_room(cost):
+            self._reject_if_over(self._ticket(cost), max_wait)
+
+    def _start(self, ticket: Ticket):
+        ticket.started_at = time.time()
+        self.active.append(ticket)
+        ADMISSION_WAIT_SECONDS.observe(ticket.started_at - ticket.queued_at, lane=ticket.lane)
+
+    async def acquire(self, cost: Cost, max_wait: Optional[float] = None, trace=None) -> Optional[Ticket]:
+        """Wait for a slot. Rejects with 429 when the estimated wait is over
+        ``max_wait`` (ADMISSION_MAX_WAIT_SECONDS if None; math.inf to always queue)"""
+        if not self.enabled:
+            return None
+        ticket = self._ticket(cost)
+        if trace:
+            trace.set(admission_lane=ticket.lane, estimated_audio_seconds=round(cost.audio_seconds, 1))
+
+        if not self._queued_ahead(ticket) and self._fits(ticket):
+            ADMISSIONS.inc(lane=ticket.lane, decision="admitted")
+            self._start(ticket)
+            return ticket
+
+        self._reject_if_over(ticket, ADMISSION_MAX_WAIT_SECONDS if max_wait is None else max_wait)
+        ADMISSIONS.inc(lane=ticket.lane, decision="queued")
+        print(f"⏳ Queued {cost.audio_seconds:.0f}s of audio ({ticket.lane} lane), "
+              f"about {self.estimated_wait(ticket):.0f}s")
+
+        ticket.admitted = asyncio.get_running_loop().create_future()
+        queue = self.queues[cost.fast]
+        queue.append(ticket)
+        try:
+            await ticket.admitted
+        except asyncio.CancelledError:
+            if ticket in queue:
+                queue.remove(ticket)
+            elif ticket in self.active:
+                self.release(ticket)
+            raise
+        if trace:
+            trace.set(admission_wait=round(ticket.started_at - ticket.queued_at, 4))
+        return ticket
+
+    def release(self, ticket: Optional[Ticket], audio_seconds: Optional[float] = None):
+        """Free the slot; ``audio_seconds`` of a finished run refines the speed estimate"""
+        if ticket is None or ticket not in self.active:
+            return
+        self.active.remove(ticket)
+
+        if audio_seconds and audio_seconds >= SPEED_MIN_AUDIO_SECONDS:
+            observed = (time.time() - ticket.started_at) / audio_seconds
+            tier = ticket.cost.tier
+            self.speed[tier] = (1 - SPEED_SMOOTHING) * self.speed[tier] + SPEED_SMOOTHING * observed
+        self._dispatch()
+
+    def _dispatch(self):
+        # Fast lane first; each lane is FIFO so a large input is not starved
+        for fast in (True, False):
+            queue = self.queues[fast]
+            while queue and self._fits(queue[0]):
+                ticket = queue.popleft()
+                if ticket.admitted.done():
+                    continue  # cancelled while queued
+                self._start(ticket)
+                ticket.admitted.set_result(None)
+            if queue:
+                return
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "active": len(self.active),
+            "queued_fast": len(self.queues[True]),
+            "queued_regular": len(self.queues[False]),
+            "memory_mb": round(sum(t.cost.memory_mb for t in self.active), 1),
+            "memory_budget_mb": round(self.memory_mb, 1),
+            "memory_reserved_fast_mb": round(self.fast_lane_memory_mb, 1),
+            "max_active": self.max_active,
+            "fast_lane_slots": self.fast_lane_slots,
+            "realtime_factors": {tier: round(v, 3) for tier, v in self.speed.items()},
+        }
@@ -1,11 +1,211 @@
-from pydub import AudioSegment
+from collections import deque
+from concurrent.futures import Future
+from typing import Iterator, Optional
+import asyncio
 import os
+import subprocess
+import threading
+import uuid
+import wave
 
+from services.video_utils import EXTRACT_MAX_TIMEOUT, extract_timeout
 
-def convert_to_wav(input_path: str) -> str:
-    audio = AudioSegment.from_file(input_path)
-    audio = audio.set_channels(1)
-    audio = audio.set_frame_rate(16000)
+PCM_RATE = 16000
+PCM_CHUNK_BYTES = 8000  # 4000 frames of 16-bit mono, same as the WAV reader
+
+# convert_to_wav copies ffmpeg's output to the WAV this much at a time, so
+# its memory use does not depend on the recording's length.
+CONVERT_CHUNK_BYTES = 128 * 1024
+
+
+class WavStream:
+    """Minimal RIFF/WAVE header reader that also works on pipes.
+
+    Unlike :mod:`wave` it accepts WAVE_FORMAT_EXTENSIBLE headers (which
+    ffmpeg writes for more than two channels) and the unknown data sizes
+    of a streamed WAV (``remaining`` is None then). ``fp`` is left at the
+    start of the samples.
+    """
+
+    def __init__(self, fp):
+        self.fp = fp
+        header = fp.read(12)
+        if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            raise ValueError("Not a WAV stream")
+
+        fmt = None
+        while True:
+            chunk = fp.read(8)
+            if len(chunk) < 8:
+                raise ValueError("WAV stream has no data chunk")
+            chunk_id, size = chunk[:4], int.from_bytes(chunk[4:], "little")
+            if chunk_id == b"data":
+                break
+            body = fp.read(size + (size & 1))
+            if chunk_id == b"fmt ":
+                fmt = body
+        if fmt is None:
+            raise ValueError("WAV stream has no fmt chunk")
+
+        self.format_tag = int.from_bytes(fmt[0:2], "little")
+        if self.format_tag == 0xFFFE and len(fmt) >= 26:
+            self.format_tag = int.from_bytes(fmt[24:26], "little")  # sub-format GUID
+        self.channels = int.from_bytes(fmt[2:4], "little")
+        self.rate = int.from_bytes(fmt[4:8], "little")
+        self.sampwidth = int.from_bytes(fmt[14:16], "little") // 8
+        self.frame_bytes = self.channels * self.sampwidth
+        # ffmpeg writing to a pipe cannot go back to fill in the size
+        self.remaining = None if size in (0, 0xFFFFFFFF) else size
+
+
+def _is_normalized(path: str, rate: int) -> bool:
+    try:
+        with wave.open(path, "rb") as wf:
+            return wf.getnchannels() == 1 and wf.getsampwidth() == 2 and wf.getframerate() == rate
+    except (wave.Error, EOFError, OSError):
+        return False
+
+
+def convert_to_wav(input_path: str, duration: Optional[float] = None) -> str:
+    """Write a 16 kHz mono 16-bit WAV next to ``input_path``, streaming.
+
+    ffmpeg downmixes and resamples (see PcmDecoder); its output is copied
+    to the WAV chunk by chunk. ``duration`` (if known) sets ffmpeg's time
+    budget.
+    """
     output_path = input_path.rsplit(".", 1)[0] + ".wav"
-    audio.export(output_path, format="wav")
-    return output_path
\ No newline at end of file
+    if output_path == input_path and _is_normalized(input_path, PCM_RATE):
+        return output_path
+
+    # The output may replace the input (a .wav upload), so write beside it
+    tmp_path = f"{output_path}.{uuid.uuid4().hex}.tmp"
+    decoder = PcmDecoder(input_path, extract_timeout(duration))
+    try:
+        with wave.open(tmp_path, "wb") as out:
+            out.setnchannels(1)
+            out.setsampwidth(2)
+            out.setframerate(PCM_RATE)
+            for pcm in decoder.chunks(CONVERT_CHUNK_BYTES):
+                out.writeframes(pcm)
+        decoder.wait()
+        os.replace(tmp_path, output_path)
+    finally:
+        decoder.kill()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return output_path
+
+
+class PcmDecoder:
+    """ffmpeg process decoding any audio/video input to 16 kHz mono s16le on stdout.
+
+    ``source`` is a path, or "pipe:0" to feed the encoded bytes through
+    :meth:`write` while the PCM is being consumed from :meth:`chunks`.
+    A watchdog kills ffmpeg after ``timeout`` seconds (None: no limit) and
+    :meth:`wait` then raises. Read :meth:`chunks` on a thread of its own
+    (see run_on_thread) when feeding a pipe: if the reader had to wait for
+    a shared pool that the writers also need, neither side could move.
+    """
+
+    def __init__(self, source: str = "pipe:0", timeout: Optional[float] = EXTRACT_MAX_TIMEOUT):
+        cmd = [
+            'ffmpeg',
+            '-hide_banner',
+            '-i', source,
+            '-vn',
+            '-f', 's16le',
+            '-acodec', 'pcm_s16le',
+            '-ac', '1',
+            '-ar', str(PCM_RATE),
+            'pipe:1'
+        ]
+        try:
+            self.process = subprocess.Popen(
+                cmd,
+                stdin=subprocess.PIPE if source == "pipe:0" else subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+        except FileNotFoundError:
+            raise RuntimeError("❌ FFmpeg not found! Install from https://ffmpeg.org/download.html")
+
+        # Drain stderr so a chatty ffmpeg never blocks on a full pipe
+        self._stderr = deque(maxlen=40)
+        self._stderr_thread = threading.Thread(target=self._drain_stderr, daemon=True)
+        self._stderr_thread.start()
+
+        self.timeout = timeout
+        self.timed_out = False
+        self._watchdog = None
+        if timeout is not None:
+            self._watchdog = threading.Timer(timeout, self._expire)
+            self._watchdog.daemon = True
+            self._watchdog.start()
+
+    def _expire(self):
+        self.timed_out = True
+        if self.process.poll() is None:
+            self.process.kill()
+
+    def _drain_stderr(self):
+        for line in self.process.stderr:
+            self._stderr.append(line.decode(errors="replace"))
+
+    def write(self, data: bytes) -> bool:
+        """Feed encoded input; returns False once ffmpeg stopped reading"""
+        try:
+            self.process.stdin.write(data)
+            return True
+        except (BrokenPipeError, ValueError):
+            return False
+
+    def close_input(self):
+        try:
+            self.process.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+
+    def chunks(self, size: int = PCM_CHUNK_BYTES) -> Iterator[bytes]:
+        while True:
+            data = self.process.stdout.read(size)
+            if not data:
+                break
+            yield data
+
+    def wait(self):
+        returncode = self.process.wait()
+        self._stderr_thread.join(timeout=1)
+        if self._watchdog:
+            self._watchdog.cancel()
+        if self.timed_out:
+            raise RuntimeError(f"FFmpeg timeout after {self.timeout:.0f}s")
+        if returncode != 0:
+            raise RuntimeError(f"FFmpeg failed: {''.join(self._stderr)}")
+
+    def kill(self):
+        if self._watchdog:
+            self._watchdog.cancel()
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+
+
+def run_on_thread(func, *args, name: str = "noteify-pcm-reader") -> asyncio.Future:
+    """Run a blocking call on a new thread of its own and await its result.
+
+    For readers of a PcmDecoder that is fed from the event loop: they block
+    until ffmpeg produces output, so they must not occupy the default
+    executor the feeding writes are queued on.
+    """
+    future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(func(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name=name, daemon=True).start()
+    return asyncio.wrap_future(future)
@@ -0,0 +1,194 @@
+import asyncio
+import json
+import math
+import os
+import time
+import traceback
+import uuid
+import zipfile
+from typing import AsyncIterator, Dict, List, Optional
+
+from services.jobs import JOB_RETENTION_SECONDS, MAX_WORKERS, JobManager
+from services.metrics import Trace
+from services.pipeline import PipelineError, run_pipeline
+from services.speech_to_text import DEFAULT_TIER
+from services.workspace import Workspace
+
+# How many files of one batch run through the pipeline at the same time.
+# Stages still share the job manager's pool, so this mostly bounds memory.
+BATCH_PARALLELISM = int(os.getenv("NOTEIFY_BATCH_PARALLELISM", str(MAX_WORKERS)))
+BATCH_MAX_FILES = int(os.getenv("NOTEIFY_BATCH_MAX_FILES", "500"))
+
+
+class Batch:
+    def __init__(self, tier: str = DEFAULT_TIER):
+        self.id = uuid.uuid4().hex
+        self.tier = tier
+        self.items: List[Dict] = []
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.tasks: List[asyncio.Task] = []
+
+    def add(self, filename: str, workspace: Workspace, input_path: str, content_hash: Optional[str]):
+        self.items.append({
+            "index": len(self.items),
+            "filename": filename,
+            "workspace": workspace,
+            "input_path": input_path,
+            "content_hash": content_hash,
+            "status": "queued",
+            "result": None,
+            "error": None,
+        })
+
+    def finish(self):
+        self.finished_at = time.time()
+
+    @property
+    def status(self) -> str:
+        return "completed" if self.finished_at else "running"
+
+    def entry(self, item: Dict) -> Dict:
+        """Public view of one file for the manifest"""
+        return {
+            "type": "file",
+            "index": item["index"],
+            "filename": item["filename"],
+            "status": item["status"],
+            "result": item["result"],
+            "error": item["error"],
+        }
+
+    def summary(self) -> Dict:
+        counts = {"completed": 0, "failed": 0}
+        for item in self.items:
+            if item["status"] in counts:
+                counts[item["status"]] += 1
+        return {
+            "type": "summary",
+            "batch_id": self.id,
+            "status": self.status,
+            "files": len(self.items),
+            **counts,
+            "zip_url": f"/api/batch/{self.id}/zip",
+        }
+
+    def to_dict(self) -> Dict:
+        return {**self.summary(), "items": [self.entry(item) for item in self.items]}
+
+
+class BatchManager:
+    """Runs many uploads through the pipeline with bounded concurrency"""
+
+    def __init__(self, jobs: JobManager, parallelism: int = BATCH_PARALLELISM):
+        self.jobs = jobs
+        self.parallelism = parallelism
+        self.batches: Dict[str, Batch] = {}
+
+    def create(self, tier: str = DEFAULT_TIER) -> Batch:
+        self._prune()
+        batch = Batch(tier)
+        self.batches[batch.id] = batch
+        return batch
+
+    def get(self, batch_id: str) -> Optional[Batch]:
+        return self.batches.get(batch_id)
+
+    async def _run_item(self, batch: Batch, item: Dict, output_dir: str,
+                        semaphore: asyncio.Semaphore) -> Dict:
+        async with semaphore:
+            item["status"] = "running"
+            trace = Trace("/api/batch", batch.tier)
+            try:
+                item["result"] = await run_pipeline(
+                    self.jobs.executor, item["input_path"], item["filename"], output_dir,
+                    cache=self.jobs.cache, content_hash=item["content_hash"], tier=batch.tier,
+                    renderer=self.jobs.renderer, trace=trace, output_id=item["workspace"].id,
+                    index=self.jobs.index, admission=self.jobs.admission, admission_wait=math.inf,
+                )
+                item["status"] = "completed"
+            except PipelineError as e:
+                item["status"] = "failed"
+                item["error"] = {"status_code": e.status_code, "detail": e.detail}
+            except Exception as e:
+                print(f"❌ Batch {batch.id} failed on {item['filename']}")
+                print(traceback.format_exc())
+                item["status"] = "failed"
+                item["error"] = {"status_code": 500, "detail": f"Processing failed: {str(e)}"}
+            finally:
+                item["workspace"].close()
+                trace.finish(item["error"]["status_code"] if item["error"] else 200)
+        return item
+
+    def start(self, batch: Batch, output_dir: str):
+        """Start a task per file once they are all added. The tasks run
+        whether or not anyone reads the manifest, so a client that
+        disconnects from it does not stop (or strand) the batch."""
+        semaphore = asyncio.Semaphore(self.parallelism)
+        batch.tasks = [
+            asyncio.create_task(self._run_item(batch, item, output_dir, semaphore))
+            for item in batch.items
+        ]
+        asyncio.gather(*batch.tasks).add_done_callback(lambda _: batch.finish())
+
+    async def manifest(self, batch: Batch) -> AsyncIterator[Dict]:
+        """Manifest entries of a started batch, files in completion order"""
+        yield {
+            "type": "batch",
+            "batch_id": batch.id,
+            "files": len(batch.items),
+            "status_url": f"/api/batch/{batch.id}",
+            "zip_url": f"/api/batch/{batch.id}/zip",
+        }
+
+        for finished in asyncio.as_completed(batch.tasks):
+            yield batch.entry(await finished)
+
+        if not batch.finished_at:
+            batch.finish()
+        yield batch.summary()
+
+    async def build_zip(self, batch: Batch, output_dir: str) -> str:
+        """ZIP of every generated PDF plus the manifest; built once per batch"""
+        zip_path = os.path.join(output_dir, f"batch-{batch.id}.zip")
+        if os.path.exists(zip_path):
+            return zip_path
+
+        pdfs = []
+        for item in batch.items:
+            if item["status"] != "completed":
+                continue
+            # Deferred PDFs are rendered now, like a first download would
+            path = await self.jobs.renderer.ensure(output_dir, item["result"]["output_id"])
+            if path:
+                pdfs.append((item, path))
+
+        await asyncio.to_thread(self._write_zip, batch, pdfs, zip_path)
+        return zip_path
+
+    @staticmethod
+    def _write_zip(batch: Batch, pdfs: List, zip_path: str):
+        names = set()
+        tmp_path = f"{zip_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            # PDFs are already compressed, so store them as they are
+            with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_STORED) as zf:
+                for item, path in pdfs:
+                    stem = os.path.splitext(item["filename"])[0] or f"file-{item['index']}"
+                    name, n = f"{stem}.pdf", 2
+                    while name in names:
+                        name, n = f"{stem} ({n}).pdf", n + 1
+                    names.add(name)
+                    zf.write(path, name)
+                zf.writestr("manifest.json", json.dumps(batch.to_dict(), indent=2),
+                            compress_type=zipfile.ZIP_DEFLATED)
+            os.replace(tmp_path, zip_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _prune(self):
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        for batch_id, batch in list(self.batches.items()):
+            if batch.finished_at and batch.finished_at < cutoff:
+                del self.batches[batch_id]
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+# Bump whenever a stage changes its output so stale entries stop matching
+PIPELINE_VERSION = "6"
+
+CACHE_ENABLED = os.getenv("NOTEIFY_CACHE_ENABLED", "1") == "1"
+CACHE_MAX_ENTRIES = int(os.getenv("NOTEIFY_CACHE_MAX_ENTRIES", "500"))
+CACHE_MAX_BYTES = int(os.getenv("NOTEIFY_CACHE_MAX_MB", "2048")) * 1024 * 1024
+CACHE_TTL_SECONDS = int(os.getenv("NOTEIFY_CACHE_TTL", str(7 * 24 * 3600)))
+
+RESULT_FILE = "result.json"
+
+
+def cache_key(content_hash: str, *parts: str) -> str:
+    """Key for an upload: its SHA-256 plus everything that shapes the output"""
+    raw = ":".join((content_hash, PIPELINE_VERSION) + parts)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class ResultCache:
+    """On-disk cache of pipeline outputs keyed by upload content.
+
+    Each entry is a directory holding the notes JSON. PDFs are not cached:
+    they carry the uploader's filename and date, so every output renders its
+    own from the notes. The directory mtime is bumped on every hit, so evicting the oldest mtime
+    first gives LRU order; entries unused for ``ttl_seconds`` are dropped
+    even when the cache is under its size limits.
+    """
+
+    def __init__(self, directory: str, max_entries: int = CACHE_MAX_ENTRIES,
+                 max_bytes: int = CACHE_MAX_BYTES, ttl_seconds: int = CACHE_TTL_SECONDS):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the stored entry or None on a miss"""
+        entry_dir = self._entry_dir(key)
+        with self._lock:
+            try:
+                last_used = os.stat(entry_dir).st_mtime
+                with open(os.path.join(entry_dir, RESULT_FILE)) as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                self.misses += 1
+                return None
+
+            if time.time() - last_used > self.ttl_seconds:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                self.evictions += 1
+                self.misses += 1
+                return None
+
+            os.utime(entry_dir)
+            self.hits += 1
+        return entry
+
+    def contains(self, key: str) -> bool:
+        """Whether ``key`` has a live entry; unlike :meth:`get` this is not
+        counted as a lookup and does not refresh the entry"""
+        entry_dir = self._entry_dir(key)
+        try:
+            last_used = os.stat(entry_dir).st_mtime
+        except OSError:
+            return False
+        return (time.time() - last_used <= self.ttl_seconds
+                and os.path.exists(os.path.join(entry_dir, RESULT_FILE)))
+
+    def put(self, key: str, notes_data: Dict, transcription_text: str,
+            segments: List[Dict]):
+        entry = {
+            "created_at": time.time(),
+            "notes": notes_data,
+            "transcription": transcription_text,
+            "segments": segments,
+        }
+
+        # Build the entry beside the final location and rename it into place
+        # so a concurrent reader never sees half an entry.
+        tmp_dir = os.path.join(self.directory, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(tmp_dir)
+        try:
+            with open(os.path.join(tmp_dir, RESULT_FILE), "w") as f:
+                json.dump(entry, f)
+
+            with self._lock:
+                entry_dir = self._entry_dir(key)
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                os.rename(tmp_dir, entry_dir)
+                self._evict()
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _evict(self):
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.startswith("."):
+                continue
+            path = self._entry_dir(name)
+            try:
+                size = sum(e.stat().st_size for e in os.scandir(path))
+                entries.append((os.stat(path).st_mtime, size, path))
+            except OSError:
+                continue
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        count = len(entries)
+
+        for mtime, size, path in entries:
+            expired = now - mtime > self.ttl_seconds
+            if not expired and count <= self.max_entries and total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            self.evictions += 1
+            total -= size
+            count -= 1
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": True,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+        }
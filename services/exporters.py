@@ -0,0 +1,107 @@
+import json
+from typing import Dict, List
+
+# Format -> (media type, file extension). Starlette appends the charset
+# to text/* types itself; only the non-text SRT type needs it spelled out
+EXPORT_FORMATS = {
+    "md": ("text/markdown", "md"),
+    "txt": ("text/plain", "txt"),
+    "json": ("application/json", "json"),
+    "srt": ("application/x-subrip; charset=utf-8", "srt"),
+    "vtt": ("text/vtt", "vtt"),
+}
+
+
+def _summary(notes_data: Dict) -> str:
+    summary = notes_data["summary"]["paragraph"].strip()
+    summary = summary.rstrip('.').rstrip('…').rstrip('...').strip()
+    if summary and not summary.endswith(('.', '!', '?')):
+        summary += '.'
+    return summary
+
+
+def _timestamp(seconds: float, separator: str) -> str:
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
+
+
+def format_clock(seconds: float) -> str:
+    """HH:MM:SS, for section headings here and in the PDF"""
+    return _timestamp(seconds, ".")[:8]
+
+
+def _section_heading(section: Dict) -> str:
+    heading = f"{format_clock(section['start'])} – {format_clock(section['end'])}"
+    if section["keywords"]:
+        heading += f" · {', '.join(section['keywords'])}"
+    return heading
+
+
+def to_markdown(notes_data: Dict, filename: str) -> str:
+    lines = [f"# Lecture Notes – {filename}", "", "## Executive Summary", "", _summary(notes_data), ""]
+    if notes_data.get("sections"):
+        lines += ["## Section Outline", ""]
+        for section in notes_data["sections"]:
+            lines += [f"### {_section_heading(section)}", "", section["summary"], ""]
+    lines += ["## Complete Transcription", ""]
+    for i, paragraph in enumerate(notes_data["full_transcription"], 1):
+        lines.append(f"{i}. {paragraph.strip()}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def to_text(notes_data: Dict, filename: str) -> str:
+    paragraphs = [p.strip() for p in notes_data["full_transcription"] if p.strip()]
+    outline = []
+    if notes_data.get("sections"):
+        outline = ["SECTION OUTLINE"] + [f"{_section_heading(s)}\n{s['summary']}" for s in notes_data["sections"]]
+    return "\n\n".join([f"LECTURE NOTES – {filename}", "EXECUTIVE SUMMARY", _summary(notes_data)]
+                       + outline + ["COMPLETE TRANSCRIPTION"] + paragraphs) + "\n"
+
+
+def to_json(notes_data: Dict, segments: List[Dict], filename: str) -> str:
+    return json.dumps({
+        "filename": filename,
+        "summary": _summary(notes_data),
+        "sections": notes_data.get("sections", []),
+        "paragraphs": notes_data["full_transcription"],
+        "segments": [
+            {"start": round(s["start"], 3), "end": round(s["end"], 3), "text": s["text"]}
+            for s in segments
+        ],
+    }, ensure_ascii=False, indent=2)
+
+
+def to_srt(segments: List[Dict]) -> str:
+    cues = []
+    for i, s in enumerate(segments, 1):
+        cues.append(
+            f"{i}\n{_timestamp(s['start'], ',')} --> {_timestamp(s['end'], ',')}\n{s['text']}\n"
+        )
+    return "\n".join(cues)
+
+
+def to_vtt(segments: List[Dict]) -> str:
+    cues = ["WEBVTT\n"]
+    for s in segments:
+        cues.append(f"{_timestamp(s['start'], '.')} --> {_timestamp(s['end'], '.')}\n{s['text']}\n")
+    return "\n".join(cues)
+
+
+def export(fmt: str, record: Dict) -> str:
+    """Render a stored notes record (see services/outputs.py) as ``fmt``"""
+    notes_data, segments, filename = record["notes"], record["segments"], record["filename"]
+    if fmt == "md":
+        return to_markdown(notes_data, filename)
+    if fmt == "txt":
+        return to_text(notes_data, filename)
+    if fmt == "json":
+        return to_json(notes_data, segments, filename)
+    if fmt == "srt":
+        return to_srt(segments)
+    if fmt == "vtt":
+        return to_vtt(segments)
+    raise ValueError(f"Unknown export format: {fmt}")
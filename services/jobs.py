@@ -0,0 +1,146 @@
+import math
+import os
+import time
+import uuid
+import traceback
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Dict, Optional
+
+from services.admission import AdmissionController
+from services.metrics import JOB_WAIT_SECONDS, Trace
+from services.outputs import PdfRenderer
+from services.pipeline import STAGES, PipelineError, run_pipeline
+from services.speech_to_text import DEFAULT_TIER
+from services.workspace import Workspace
+
+# "thread" keeps everything in one process; "process" sidesteps the GIL for
+# the pure-Python stages at the cost of one model copy per worker.
+EXECUTOR_KIND = os.getenv("NOTEIFY_EXECUTOR", "thread")
+MAX_WORKERS = int(os.getenv("NOTEIFY_WORKERS", str(os.cpu_count() or 2)))
+JOB_RETENTION_SECONDS = int(os.getenv("NOTEIFY_JOB_RETENTION", "3600"))
+
+
+def create_executor(kind: str = EXECUTOR_KIND, max_workers: int = MAX_WORKERS):
+    if kind == "process":
+        return ProcessPoolExecutor(max_workers=max_workers)
+    if kind == "thread":
+        return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="noteify")
+    raise ValueError(f"Unknown executor kind: {kind}")
+
+
+class Job:
+    def __init__(self, filename: str, tier: str = DEFAULT_TIER):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.tier = tier
+        self.status = "queued"
+        self.stage: Optional[str] = None
+        self.stages = {name: "pending" for name in STAGES}
+        self.progress = 0.0
+        self.draft: Optional[str] = None
+        self.result: Optional[Dict] = None
+        self.error: Optional[Dict] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    def update_stage(self, stage: str, state: str):
+        self.status = "running"
+        if state == "running":
+            self.stage = stage
+        self.stages[stage] = state
+        self.progress = round(
+            sum(w for name, w in STAGES.items() if self.stages[name] in ("done", "skipped", "deferred")), 2
+        )
+
+    def set_draft(self, text: str):
+        self.draft = text
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "tier": self.tier,
+            "status": self.status,
+            "stage": self.stage,
+            "stages": dict(self.stages),
+            "progress": self.progress,
+            "draft_transcription": self.draft,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """Keeps track of background pipeline runs and the pool they execute on"""
+
+    def __init__(self, executor=None, cache=None, index=None, admission=None):
+        self.executor = executor or create_executor()
+        self.cache = cache
+        self.index = index
+        self.admission = admission or AdmissionController()
+        self.renderer = PdfRenderer(self.executor)
+        self.jobs: Dict[str, Job] = {}
+
+    def create(self, filename: str, tier: str = DEFAULT_TIER) -> Job:
+        self._prune()
+        job = Job(filename, tier)
+        self.jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def discard(self, job: Job):
+        self.jobs.pop(job.id, None)
+
+    async def run(self, job: Job, input_path: str, output_dir: str,
+                  content_hash: Optional[str] = None, workspace: Optional[Workspace] = None,
+                  duration: Optional[float] = None):
+        """Run the job's pipeline; its outputs are stored under the job id.
+        ``duration`` is the input's length if the caller already measured it."""
+        trace = Trace("/api/jobs", job.tier)
+        queue_wait = time.time() - job.created_at
+        JOB_WAIT_SECONDS.observe(queue_wait)
+        trace.set(job_id=job.id, queue_wait=round(queue_wait, 4))
+
+        try:
+            job.result = await run_pipeline(
+                self.executor, input_path, job.filename, output_dir,
+                on_stage=job.update_stage, cache=self.cache, content_hash=content_hash,
+                tier=job.tier, on_draft=job.set_draft, renderer=self.renderer, trace=trace,
+                output_id=job.id, index=self.index,
+                admission=self.admission, admission_wait=math.inf,  # accepted jobs queue
+                duration=duration,
+            )
+            job.status = "completed"
+            job.progress = 1.0
+        except PipelineError as e:
+            job.status = "failed"
+            job.error = {"status_code": e.status_code, "detail": e.detail}
+        except Exception as e:
+            print("❌ Error occurred")
+            print(traceback.format_exc())
+            job.status = "failed"
+            job.error = {"status_code": 500, "detail": f"Processing failed: {str(e)}"}
+        finally:
+            if job.stage and job.stages[job.stage] == "running":
+                job.stages[job.stage] = "failed"
+            job.finished_at = time.time()
+            if workspace:
+                workspace.close()
+            trace.finish(job.error["status_code"] if job.error else 200)
+
+    def counts(self) -> Dict[str, int]:
+        counts = {}
+        for job in list(self.jobs.values()):
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _prune(self):
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        for job_id, job in list(self.jobs.items()):
+            if job.finished_at and job.finished_at < cutoff:
+                del self.jobs[job_id]
@@ -0,0 +1,84 @@
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional
+
+from services.audio_utils import PCM_RATE, PcmDecoder, run_on_thread
+from services.speech_to_text import DEFAULT_TIER, LiveRecognizer, get_model, refine_segments, tier_model_name
+
+# Sample rates accepted for raw PCM; outside this the recognizer either
+# hears nothing useful or is handed an absurd resampling ratio
+MIN_PCM_RATE = 8000
+MAX_PCM_RATE = 48000
+
+
+class LiveSession:
+    """Recognition state for one live connection.
+
+    With ``encoding="pcm"`` chunks must be 16-bit mono PCM at ``rate``;
+    anything else (webm/opus from MediaRecorder, mp3, ...) is piped through
+    ffmpeg first. Recognizer events are published on :meth:`events`; in
+    the "refine" tier they are the fast draft and refinement runs at the end.
+    """
+
+    def __init__(self, encoding: str = "pcm", rate: int = PCM_RATE, tier: str = DEFAULT_TIER):
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self.decoder: Optional[PcmDecoder] = None
+        self._reader = None
+
+        if encoding == "pcm":
+            self.recognizer = LiveRecognizer(rate, partials=True, tier=tier)
+        else:
+            # No time limit: the session lasts as long as the client is
+            # connected, and close() kills ffmpeg when it goes
+            self.decoder = PcmDecoder("pipe:0", timeout=None)
+            self.recognizer = LiveRecognizer(PCM_RATE, partials=True, tier=tier)
+            self._reader = run_on_thread(self._read_decoder, name="noteify-live-reader")
+
+    @classmethod
+    async def open(cls, encoding: str = "pcm", rate: int = PCM_RATE, tier: str = DEFAULT_TIER) -> "LiveSession":
+        """Create a session without blocking the event loop on a model load
+        (lazy loading, or the first use of a non-default tier)"""
+        await asyncio.to_thread(get_model, tier_model_name(tier))
+        return cls(encoding, rate, tier)
+
+    def _emit(self, event: Optional[Dict]):
+        if event:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, event)
+
+    def _read_decoder(self):
+        for data in self.decoder.chunks():
+            self._emit(self.recognizer.accept(data))
+
+    async def feed(self, data: bytes):
+        if self.decoder:
+            if not await self._loop.run_in_executor(None, self.decoder.write, data):
+                raise RuntimeError("Audio decoder stopped accepting input")
+        else:
+            self._emit(await self._loop.run_in_executor(None, self.recognizer.accept, data))
+
+    async def finish(self) -> List[Dict]:
+        """Flush the recognizer and return the timed transcript segments"""
+        if self.decoder:
+            self.decoder.close_input()
+            await self._reader
+            await self._loop.run_in_executor(None, self.decoder.wait)
+
+        self._emit(await self._loop.run_in_executor(None, self.recognizer.finish))
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, None)
+
+        if self.recognizer.refine:
+            await self._loop.run_in_executor(
+                None, refine_segments, self.recognizer.segments, self.recognizer.rate
+            )
+        return self.recognizer.segments
+
+    async def events(self) -> AsyncIterator[Dict]:
+        while True:
+            event = await self._queue.get()
+            if event is None:
+                return
+            yield event
+
+    def close(self):
+        if self.decoder:
+            self.decoder.kill()
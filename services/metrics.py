@@ -0,0 +1,265 @@
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Requests slower than this many seconds get their stage profiles merged
+# into PROFILE_DIR/<trace id>.prof; 0 disables profiling entirely.
+PROFILE_SLOW_SECONDS = float(os.getenv("NOTEIFY_PROFILE_SLOW_SECONDS", "0"))
+PROFILE_DIR = os.getenv("NOTEIFY_PROFILE_DIR", "profiles")
+
+SECONDS_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+BYTES_BUCKETS = tuple(1024 * 1024 * mb for mb in (1, 5, 10, 25, 50, 100, 250, 500, 1000))
+AUDIO_BUCKETS = (10, 30, 60, 300, 600, 1200, 1800, 3600, 5400, 7200)
+RTF_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2)
+PAGE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+# ─────────────────────────────────────────────
+# Prometheus-style metric types
+# ─────────────────────────────────────────────
+def _labels(names: Sequence[str], values: Tuple) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{v}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_labels(self.labelnames, k)} {v}" for k, v in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = SECONDS_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # label values -> [count per bucket..., +Inf count, sum]
+        self._values: Dict[Tuple, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            row = self._values.setdefault(key, [0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+            row[-2] += 1
+            row[-1] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, row in self._values.items():
+                for bound, count in zip(self.buckets + ("+Inf",), row):
+                    le = _labels(self.labelnames + ("le",), key + (bound,))
+                    lines.append(f"{self.name}_bucket{le} {count}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {row[-2]}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {row[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Text exposition format served by /metrics"""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.register(Counter(
+    "noteify_requests_total", "Pipeline requests by route and status code", ["route", "status"]))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "noteify_request_duration_seconds", "End-to-end pipeline request latency", ["route"]))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "noteify_stage_duration_seconds", "Time spent inside each pipeline stage", ["stage"]))
+STAGE_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "noteify_stage_queue_wait_seconds", "Time a stage waited for a free worker", ["stage"]))
+JOB_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "noteify_job_queue_wait_seconds", "Time from job creation until its pipeline started"))
+INPUT_BYTES = REGISTRY.register(Histogram(
+    "noteify_input_bytes", "Size of uploaded media", buckets=BYTES_BUCKETS))
+AUDIO_SECONDS = REGISTRY.register(Histogram(
+    "noteify_audio_duration_seconds", "Duration of the decoded audio", buckets=AUDIO_BUCKETS))
+ASR_RTF = REGISTRY.register(Histogram(
+    "noteify_asr_realtime_factor", "Transcription time divided by audio duration", ["tier"],
+    buckets=RTF_BUCKETS))
+PDF_PAGES = REGISTRY.register(Histogram(
+    "noteify_pdf_pages", "Pages per rendered PDF", buckets=PAGE_BUCKETS))
+ADMISSIONS = REGISTRY.register(Counter(
+    "noteify_admissions_total", "Admission decisions by lane", ["lane", "decision"]))
+ADMISSION_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "noteify_admission_wait_seconds", "Time a request queued for admission", ["lane"]))
+
+# Point-in-time values, refreshed by /metrics before rendering
+CACHE_LOOKUPS = REGISTRY.register(Gauge(
+    "noteify_cache_lookups", "Result cache lookups since start", ["result"]))
+JOBS = REGISTRY.register(Gauge(
+    "noteify_jobs", "Tracked background jobs by status", ["status"]))
+ADMISSION_LOAD = REGISTRY.register(Gauge(
+    "noteify_admission_load", "Admitted and queued pipeline runs, and their memory estimate",
+    ["kind"]))
+
+
+# ─────────────────────────────────────────────
+# Per-request spans
+# ─────────────────────────────────────────────
+# Only one cProfile profiler can be active per process (an error on 3.12+);
+# a stage that starts while another is being profiled runs unprofiled
+_profile_lock = threading.Lock()
+
+
+def timed_call(func, submitted: float, profile_path: Optional[str], *args):
+    """Run ``func`` on a worker and report (value, queue wait, run time).
+
+    Wall-clock times so they stay comparable across pool processes.
+    """
+    started = time.time()
+    profiler = None
+    if profile_path and _profile_lock.acquire(blocking=False):
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        value = func(*args)
+    finally:
+        if profiler:
+            profiler.disable()
+            _profile_lock.release()
+            profiler.dump_stats(profile_path)
+    return value, started - submitted, time.time() - started
+
+
+class Trace:
+    """Timing spans and attributes for one pipeline request.
+
+    Spans feed the stage histograms as they are recorded. :meth:`finish`
+    (or leaving the ``with`` block) records the request itself, logs the
+    whole trace as one JSON line and keeps a profile if it was slow.
+    """
+
+    def __init__(self, route: Optional[str] = None, tier: Optional[str] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.route = route
+        self.tier = tier
+        self.started = time.time()
+        self.spans: List[Dict] = []
+        self.attrs: Dict = {}
+        self._profiles: List[str] = []
+        self._finished = False
+
+    def profile_path(self, stage: str) -> Optional[str]:
+        if not PROFILE_SLOW_SECONDS or not self.route:
+            return None
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{self.id}-{stage}-{len(self._profiles)}.prof")
+        self._profiles.append(path)
+        return path
+
+    def span(self, stage: str, seconds: float, wait: float = 0.0):
+        self.spans.append({"stage": stage, "seconds": round(seconds, 4), "wait": round(wait, 4)})
+        STAGE_SECONDS.observe(seconds, stage=stage)
+        STAGE_WAIT_SECONDS.observe(wait, stage=stage)
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def stage_seconds(self, stage: str) -> float:
+        return sum(s["seconds"] for s in self.spans if s["stage"] == stage)
+
+    def finish(self, status: int = 200):
+        if self._finished:
+            return
+        self._finished = True
+        total = time.time() - self.started
+
+        if "input_bytes" in self.attrs:
+            INPUT_BYTES.observe(self.attrs["input_bytes"])
+        if "pdf_pages" in self.attrs:
+            PDF_PAGES.observe(self.attrs["pdf_pages"])
+        audio = self.attrs.get("audio_seconds")
+        transcribe = self.stage_seconds("transcribe")
+        if audio:
+            AUDIO_SECONDS.observe(audio)
+            if transcribe:
+                self.attrs["asr_rtf"] = round(transcribe / audio, 4)
+                ASR_RTF.observe(self.attrs["asr_rtf"], tier=self.tier)
+
+        if self.route:
+            REQUESTS.inc(route=self.route, status=status)
+            REQUEST_SECONDS.observe(total, route=self.route)
+            print(f"📊 {json.dumps(self.to_dict(status, total))}")
+        self._save_profile(total)
+
+    def _save_profile(self, total: float):
+        paths = [p for p in self._profiles if os.path.exists(p)]
+        try:
+            if paths and total >= PROFILE_SLOW_SECONDS:
+                target = os.path.join(PROFILE_DIR, f"{self.id}.prof")
+                pstats.Stats(*paths).dump_stats(target)
+                print(f"🐢 Slow request ({total:.1f}s), profile saved to {target}")
+        finally:
+            for path in paths:
+                os.remove(path)
+
+    def to_dict(self, status: int, total: float) -> Dict:
+        return {
+            "trace_id": self.id,
+            "route": self.route,
+            "tier": self.tier,
+            "status": status,
+            "seconds": round(total, 4),
+            "spans": self.spans,
+            **self.attrs,
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.finish(200 if exc is None else getattr(exc, "status_code", 500))
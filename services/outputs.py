@@ -0,0 +1,132 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+from services.metrics import PDF_PAGES, STAGE_SECONDS, STAGE_WAIT_SECONDS, timed_call
+from services.pdf_generator import create_pdf
+
+# eager      - render the PDF before responding (the original behaviour)
+# background - respond as soon as the notes exist, render on the worker pool
+# lazy       - render on the first /api/download hit
+PDF_MODE = os.getenv("NOTEIFY_PDF_MODE", "background")
+
+NOTES_SUFFIX = ".notes.json"
+
+
+def notes_path(output_dir: str, stem: str) -> str:
+    return os.path.join(output_dir, stem + NOTES_SUFFIX)
+
+
+def pdf_path(output_dir: str, stem: str) -> str:
+    return os.path.join(output_dir, stem + ".pdf")
+
+
+def _write_atomic(path: str, write):
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        value = write(tmp_path)
+        os.replace(tmp_path, path)
+        return value
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def save_notes(output_dir: str, stem: str, notes_data: Dict, segments: List[Dict],
+               filename: str):
+    """Persist everything the PDF and the export formats are rendered from"""
+    record = {
+        "filename": filename,
+        "notes": notes_data,
+        "segments": segments,
+    }
+
+    def write(tmp_path):
+        with open(tmp_path, "w") as f:
+            json.dump(record, f)
+
+    _write_atomic(notes_path(output_dir, stem), write)
+
+
+def load_notes(output_dir: str, stem: str) -> Optional[Dict]:
+    try:
+        with open(notes_path(output_dir, stem)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def render_pdf(output_dir: str, stem: str) -> Dict:
+    """Render ``stem``.pdf from its stored notes (module level for process pools)"""
+    record = load_notes(output_dir, stem)
+    if record is None:
+        raise FileNotFoundError(notes_path(output_dir, stem))
+
+    print("📄 Creating professional PDF...")
+    # Write beside the target and rename, so a download never sees a
+    # half-written file.
+    target = pdf_path(output_dir, stem)
+    pages = _write_atomic(target, lambda tmp_path: create_pdf(record["notes"], tmp_path, record["filename"]))
+    return {"path": target, "pages": pages}
+
+
+class PdfRenderer:
+    """Runs PDF renders on the worker pool, at most one per output file"""
+
+    def __init__(self, executor):
+        self.executor = executor
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def schedule(self, output_dir: str, stem: str) -> Future:
+        target = pdf_path(output_dir, stem)
+        with self._lock:
+            future = self._pending.get(target)
+            if future is None:
+                future = self.executor.submit(timed_call, render_pdf, time.time(), None,
+                                              output_dir, stem)
+                self._pending[target] = future
+                future.add_done_callback(lambda f: self._finished(target, f))
+            return future
+
+    def _finished(self, target: str, future: Future):
+        with self._lock:
+            self._pending.pop(target, None)
+
+        if future.cancelled() or future.exception():
+            if future.exception():
+                print(f"❌ PDF rendering failed for {target}: {future.exception()}")
+            return
+
+        result, wait, seconds = future.result()
+        STAGE_SECONDS.observe(seconds, stage="pdf")
+        STAGE_WAIT_SECONDS.observe(wait, stage="pdf")
+        PDF_PAGES.observe(result["pages"])
+
+    async def cancel(self, output_dir: str, stem: str):
+        """Drop a scheduled render of ``stem``, or wait out one already running"""
+        with self._lock:
+            future = self._pending.get(pdf_path(output_dir, stem))
+        if future is not None and not future.cancel():
+            await asyncio.gather(asyncio.wrap_future(future), return_exceptions=True)
+
+    async def ensure(self, output_dir: str, stem: str) -> Optional[str]:
+        """Path of a finished PDF, rendering it first if needed; None if unknown"""
+        target = pdf_path(output_dir, stem)
+        with self._lock:
+            future = self._pending.get(target)
+
+        if future is None:
+            if os.path.exists(target):
+                return target
+            if not os.path.exists(notes_path(output_dir, stem)):
+                return None
+            future = self.schedule(output_dir, stem)
+
+        await asyncio.wrap_future(future)
+        return target
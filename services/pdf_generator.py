@@ -14,27 +14,40 @@ from reportlab.lib.units import inch
 from reportlab.pdfgen import canvas
 from datetime import datetime
 
+from services.exporters import format_clock
+
 # ─────────────────────────────────────────────
 # Professional Page Design with Canvas
 # ─────────────────────────────────────────────
 class NumberedCanvas(canvas.Canvas):
+    """Draws header/footer as each page closes.
+
+    "Page X of Y" needs the total before it is known, so each footer only
+    references a tiny form XObject; the forms are filled in on save().
+    Nothing but the page count is kept per page, so memory stays flat
+    however long the document gets.
+    """
+
     def __init__(self, *args, **kwargs):
         canvas.Canvas.__init__(self, *args, **kwargs)
-        self._pages = []
+        self._generated_on = datetime.now().strftime('%d %B %Y')
 
     def showPage(self):
-        self._pages.append(dict(self.__dict__))
-        self._startPage()
+        self.draw_page_decorations(self.getPageNumber())
+        canvas.Canvas.showPage(self)
 
     def save(self):
-        page_count = len(self._pages)
-        for page_num, page in enumerate(self._pages, 1):
-            self.__dict__.update(page)
-            self.draw_page_decorations(page_num, page_count)
-            canvas.Canvas.showPage(self)
+        total_pages = self.getPageNumber() - 1
+        width, _ = A4
+        for page_num in range(1, total_pages + 1):
+            self.beginForm(f"NoteifyPageOf{page_num}")
+            self.setFont("Helvetica", 9)
+            self.setFillColor(HexColor("#64748B"))
+            self.drawRightString(width - 50, 30, f"Page {page_num} of {total_pages}")
+            self.endForm()
         canvas.Canvas.save(self)
 
-    def draw_page_decorations(self, page_num, total_pages):
+    def draw_page_decorations(self, page_num):
         width, height = A4
         
         # Professional header background
@@ -58,8 +71,8 @@ class NumberedCanvas(canvas.Canvas):
         # Footer
         self.setFont("Helvetica", 9)
         self.setFillColor(HexColor("#64748B"))
-        self.drawString(50, 30, f"Generated on {datetime.now().strftime('%d %B %Y')}")
-        self.drawRightString(width - 50, 30, f"Page {page_num} of {total_pages}")
+        self.drawString(50, 30, f"Generated on {self._generated_on}")
+        self.doForm(f"NoteifyPageOf{page_num}")
         
         # Footer line
         self.setStrokeColor(HexColor("#E2E8F0"))
@@ -67,27 +80,16 @@ class NumberedCanvas(canvas.Canvas):
         self.line(50, 45, width - 50, 45)
 
 # ─────────────────────────────────────────────
-# Professional PDF Generator
+# Styles (built once per process, shared by every create_pdf call)
 # ─────────────────────────────────────────────
-def create_pdf(notes_data: dict, output_path: str, original_filename: str):
-    """Create a professional, beautifully aligned PDF with unique style names"""
-    
-    doc = SimpleDocTemplate(
-        output_path,
-        pagesize=A4,
-        rightMargin=50,
-        leftMargin=50,
-        topMargin=100,
-        bottomMargin=60
-    )
-
+def _build_styles():
     # Get default styles
     styles = getSampleStyleSheet()
 
     # ═══════════════════════════════════════════
     # CUSTOM PROFESSIONAL STYLES - UNIQUE NAMES
     # ═══════════════════════════════════════════
-    
+
     styles.add(ParagraphStyle(
         name="NoteifyTitle",
         fontName="Helvetica-Bold",
@@ -147,6 +149,16 @@ def create_pdf(notes_data: dict, output_path: str, original_filename: str):
         borderPadding=12
     ))
 
+    styles.add(ParagraphStyle(
+        name="NoteifySectionHeading",
+        fontName="Helvetica-Bold",
+        fontSize=11,
+        textColor=HexColor("#0F172A"),
+        spaceBefore=6,
+        spaceAfter=4,
+        leading=14
+    ))
+
     styles.add(ParagraphStyle(
         name="NoteifyContent",
         fontName="Helvetica",
@@ -159,6 +171,29 @@ def create_pdf(notes_data: dict, output_path: str, original_filename: str):
         rightIndent=0
     ))
 
+    return styles
+
+
+STYLES = _build_styles()
+
+# ─────────────────────────────────────────────
+# Professional PDF Generator
+# ─────────────────────────────────────────────
+def create_pdf(notes_data: dict, output_path: str, original_filename: str,
+               canvasmaker=NumberedCanvas) -> int:
+    """Create a professional, beautifully aligned PDF; returns the page count"""
+    
+    doc = SimpleDocTemplate(
+        output_path,
+        pagesize=A4,
+        rightMargin=50,
+        leftMargin=50,
+        topMargin=100,
+        bottomMargin=60
+    )
+
+    styles = STYLES
+
     # ═══════════════════════════════════════════
     # BUILD DOCUMENT STORY
     # ═══════════════════════════════════════════
@@ -211,6 +246,20 @@ def create_pdf(notes_data: dict, output_path: str, original_filename: str):
     story.append(Paragraph(summary_text, styles["NoteifySummary"]))
     story.append(Spacer(1, 15))
 
+    # ─────────────────────────────────────────
+    # SECTION OUTLINE (long lectures only)
+    # ─────────────────────────────────────────
+    sections = notes_data.get("sections")
+    if sections:
+        story.append(Paragraph("SECTION OUTLINE", styles["NoteifySectionTitle"]))
+        for i, section in enumerate(sections, 1):
+            heading = f"{i}. {format_clock(section['start'])} – {format_clock(section['end'])}"
+            if section["keywords"]:
+                heading += f"&nbsp;&nbsp;·&nbsp;&nbsp;{', '.join(k.capitalize() for k in section['keywords'])}"
+            story.append(Paragraph(heading, styles["NoteifySectionHeading"]))
+            story.append(Paragraph(section["summary"], styles["NoteifyContent"]))
+        story.append(PageBreak())
+
     # ─────────────────────────────────────────
     # COMPLETE TRANSCRIPTION
     # ─────────────────────────────────────────
@@ -234,4 +283,5 @@ def create_pdf(notes_data: dict, output_path: str, original_filename: str):
     # ─────────────────────────────────────────
     # BUILD PDF WITH CUSTOM CANVAS
     # ─────────────────────────────────────────
-    doc.build(story, canvasmaker=NumberedCanvas)
+    doc.build(story, canvasmaker=canvasmaker)
+    return doc.page
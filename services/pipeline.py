@@ -0,0 +1,626 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import wave
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+
+from services.cache import ResultCache, cache_key
+from services.audio_utils import PCM_RATE, PcmDecoder, convert_to_wav, run_on_thread
+from services.video_utils import (
+    LONG_INPUT_SECONDS,
+    LONG_SEGMENT_SECONDS,
+    extract_audio_from_video,
+    iter_slices,
+    extract_timeout,
+    probe_duration,
+)
+from services.speech_to_text import (
+    ASR_BACKEND,
+    ASR_WORKERS,
+    DEFAULT_TIER,
+    QUALITY_TIERS,
+    REFINE_CONFIDENCE,
+    SEGMENT_SECONDS,
+    iter_segments,
+    refine_segments,
+    tier_model_paths,
+    transcribe_segments,
+    transcribe_slices,
+    transcribe_stream,
+)
+from services.summarizer import (
+    SECTION_SECONDS,
+    SECTIONS_ENABLED,
+    SECTIONS_MIN_SECONDS,
+    SUMMARY_MODE,
+    needs_sections,
+    reduce_sections,
+    split_windows,
+    summarize_segments,
+    summarize_text,
+    summarize_window,
+)
+from services.vad import (
+    VAD_ENABLED,
+    VAD_MARGIN_DB,
+    VAD_MAX_DBFS,
+    VAD_MIN_DBFS,
+    VAD_MIN_GAP_SECONDS,
+    VAD_PADDING_SECONDS,
+    wav_has_speech,
+)
+from services.outputs import PDF_MODE, PdfRenderer, render_pdf, save_notes
+from services.exporters import EXPORT_FORMATS
+from services.metrics import Trace, timed_call
+from services.search import SearchIndex
+from services.workspace import new_output_id
+
+AUDIO_FORMATS = {".mp3", ".wav", ".m4a", ".aac"}
+VIDEO_FORMATS = {".mp4", ".avi", ".mov", ".mkv", ".webm"}
+
+# "stream" decodes straight from the upload to PCM on a pipe (no MP3/WAV
+# intermediates); "files" keeps the extract -> convert -> WAV path, which
+# parallel ASR (NOTEIFY_ASR_WORKERS > 1) needs for random access.
+DECODE_MODE = os.getenv("NOTEIFY_DECODE_MODE", "stream" if ASR_WORKERS <= 1 else "files")
+
+# Stage name -> share of the overall progress bar once the stage finishes
+STAGES = {
+    "extract": 0.10,
+    "convert": 0.10,
+    "transcribe": 0.50,
+    "refine": 0.10,
+    "summarize": 0.10,
+    "pdf": 0.10,
+}
+
+
+class PipelineError(Exception):
+    """Error that should be reported to the client with a specific status code"""
+
+    def __init__(self, status_code: int, detail: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.headers = headers
+
+    def __reduce__(self):
+        # Default pickling replays only ``args``; process pools need all of them
+        return PipelineError, (self.status_code, self.detail, self.headers)
+
+
+# ─────────────────────────────────────────────
+# Stage Functions (module level so process pools can pickle them)
+# ─────────────────────────────────────────────
+def extract_stage(input_path: str, file_ext: str) -> str:
+    if file_ext in VIDEO_FORMATS:
+        print("🎥 Extracting audio from video...")
+        return extract_audio_from_video(input_path)
+    if file_ext in AUDIO_FORMATS:
+        print("🎵 Processing audio file...")
+        return input_path
+    raise PipelineError(400, f"Unsupported file format: {file_ext}")
+
+
+def convert_stage(audio_path: str, duration: Optional[float] = None) -> str:
+    print("🔄 Converting to WAV...")
+    return convert_to_wav(audio_path, duration)
+
+
+def transcribe_stage(wav_path: str, tier: str = DEFAULT_TIER) -> List[Dict]:
+    # A silent file is rejected before a recognizer is even created
+    if VAD_ENABLED and not wav_has_speech(wav_path):
+        raise PipelineError(400, "No speech detected in the audio")
+    print("🎙️ Transcribing audio...")
+    return transcribe_segments(wav_path, tier=tier)
+
+
+def long_transcribe_stage(input_path: str, duration: float, tier: str = DEFAULT_TIER) -> List[Dict]:
+    print("🎙️ Transcribing long input slice by slice...")
+    return transcribe_slices(iter_slices(input_path, duration), tier=tier)
+
+
+def recognize_pcm(chunks: Iterable[bytes], tier: str = DEFAULT_TIER) -> Tuple[List[Dict], Optional[Dict], float]:
+    """Recognize PCM chunks and, when the text is final, build the notes in
+    the same pass: segments flow through the sentence/paragraph generators
+    as the recognizer emits them. The "refine" tier still has to rewrite
+    segments, so it returns no notes. Also returns the audio duration."""
+    frames = 0
+
+    def counted():
+        nonlocal frames
+        for data in chunks:
+            frames += len(data) // 2
+            yield data
+
+    if tier == "refine":
+        return transcribe_stream(counted(), PCM_RATE, tier), None, frames / PCM_RATE
+
+    segments = []
+
+    def texts():
+        for segment in iter_segments(counted(), PCM_RATE, tier=tier):
+            segments.append(segment)
+            yield segment["text"]
+
+    notes_data = summarize_segments(texts())
+    return segments, notes_data, frames / PCM_RATE
+
+
+def stream_transcribe_stage(input_path: str, tier: str = DEFAULT_TIER,
+                            duration: Optional[float] = None) -> Tuple[List[Dict], Optional[Dict], float]:
+    print("🎙️ Decoding and transcribing audio stream...")
+    decoder = PcmDecoder(input_path, extract_timeout(duration))
+    try:
+        result = recognize_pcm(decoder.chunks(), tier)
+        decoder.wait()
+    finally:
+        decoder.kill()
+    return result
+
+
+def wav_seconds(wav_path: str) -> float:
+    with wave.open(wav_path, "rb") as wf:
+        return wf.getnframes() / wf.getframerate()
+
+
+def refine_stage(segments: List[Dict]) -> List[Dict]:
+    print("🔎 Refining low-confidence segments...")
+    return refine_segments(segments, PCM_RATE)
+
+
+def segments_text(segments: List[Dict]) -> str:
+    return " ".join(s["text"] for s in segments)
+
+
+def _require_speech(transcription_text: str) -> str:
+    if not transcription_text.strip():
+        raise PipelineError(400, "No speech detected in the audio")
+    return transcription_text
+
+
+def check_tier(tier: str):
+    if tier not in QUALITY_TIERS:
+        raise PipelineError(400, f"Unknown quality tier: {tier}")
+
+
+def summarize_stage(transcription_text: str) -> Dict:
+    print("📚 Generating structured summary...")
+    return summarize_text(transcription_text)
+
+
+def build_result(filename: str, notes_data: Dict, output_id: str) -> Dict:
+    """Shape the notes into the JSON returned by /api/process"""
+    full_transcription = " ".join(notes_data["full_transcription"])
+    summary = notes_data["summary"]["paragraph"].strip()
+
+    summary = summary.rstrip('.').rstrip('…').rstrip('...').strip()
+    if not summary.endswith(('.', '!', '?')):
+        summary += '.'
+
+    output = {
+        "full_transcription": full_transcription,
+        "summary_paragraph": summary
+    }
+    if notes_data.get("sections"):
+        output["sections"] = notes_data["sections"]
+
+    return {
+        "success": True,
+        "filename": filename,
+        "output": output,
+        "output_id": output_id,
+        "pdf_url": f"/api/download/{output_id}",
+        "exports": {fmt: f"/api/export/{output_id}/{fmt}" for fmt in EXPORT_FORMATS}
+    }
+
+
+# ─────────────────────────────────────────────
+# Orchestration
+# ─────────────────────────────────────────────
+def _stage_runner(executor, on_stage, trace: Trace):
+    loop = asyncio.get_running_loop()
+
+    async def stage(name, func, *args):
+        if on_stage:
+            on_stage(name, "running")
+        value, wait, seconds = await loop.run_in_executor(
+            executor, timed_call, func, time.time(), trace.profile_path(name), *args
+        )
+        trace.span(name, seconds, wait)
+        if on_stage:
+            on_stage(name, "done")
+        return value
+
+    return stage
+
+
+def _skip(on_stage, *names):
+    if on_stage:
+        for name in names:
+            on_stage(name, "skipped")
+
+
+def pipeline_cache_key(content_hash: str, tier: str) -> str:
+    """Key for an upload under the current settings: every option that can
+    change the segments or notes is part of it"""
+    settings = {
+        "asr": ASR_BACKEND,
+        "decode": DECODE_MODE,
+        "parallel": ASR_WORKERS > 1,
+        "segment": SEGMENT_SECONDS,
+        "long": [LONG_INPUT_SECONDS, LONG_SEGMENT_SECONDS],
+        "vad": [VAD_ENABLED, VAD_MARGIN_DB, VAD_MIN_DBFS, VAD_MAX_DBFS,
+                VAD_PADDING_SECONDS, VAD_MIN_GAP_SECONDS],
+        "refine": REFINE_CONFIDENCE,
+        "summary": SUMMARY_MODE,
+        "sections": [SECTIONS_ENABLED, SECTION_SECONDS, SECTIONS_MIN_SECONDS],
+    }
+    return cache_key(content_hash, tier, json.dumps(settings, sort_keys=True), *tier_model_paths(tier))
+
+
+def _deliver_pdf(renderer: Optional[PdfRenderer], output_dir: str, stem: str, on_stage=None):
+    """Hand the PDF to the background renderer, or leave it for first download"""
+    if PDF_MODE == "background":
+        renderer.schedule(output_dir, stem)
+    if on_stage:
+        on_stage("pdf", "deferred")
+
+
+async def _admit(admission, max_wait: Optional[float], trace: Trace, filename: str,
+                 tier: str, **source):
+    """Wait for an admission slot (see services/admission.py); None without a controller"""
+    if admission is None:
+        return None
+    cost = await asyncio.to_thread(admission.estimate, filename, tier, **source)
+    return await admission.acquire(cost, max_wait, trace)
+
+
+async def _prepend(first: bytes, rest: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    yield first
+    async for chunk in rest:
+        yield chunk
+
+
+def index_notes(index: Optional[SearchIndex], output_id: str, filename: str,
+                notes_data: Dict, segments: List[Dict]):
+    if index is None:
+        return
+    try:
+        index.add(output_id, filename, notes_data, segments)
+    except sqlite3.Error as e:
+        print(f"⚠️ Could not index transcript: {e}")
+
+
+def _from_cache(cache: Optional[ResultCache], content_hash: Optional[str],
+                tier: str, filename: str, output_id: str, output_dir: str,
+                on_stage=None, renderer: Optional[PdfRenderer] = None,
+                trace: Optional[Trace] = None, index: Optional[SearchIndex] = None) -> Optional[Dict]:
+    if not cache or not content_hash:
+        return None
+    key = pipeline_cache_key(content_hash, tier)
+    entry = cache.get(key)
+    if entry is None:
+        return None
+
+    print(f"⚡ Cache hit for {filename}")
+    if trace:
+        trace.set(cache_hit=True)
+    save_notes(output_dir, output_id, entry["notes"], entry["segments"], filename)
+    index_notes(index, output_id, filename, entry["notes"], entry["segments"])
+    _skip(on_stage, *STAGES)
+
+    # Rendered afresh rather than shared: the PDF shows this upload's filename
+    if renderer:
+        _deliver_pdf(renderer, output_dir, output_id)
+    else:
+        render_pdf(output_dir, output_id)
+    return build_result(filename, entry["notes"], output_id)
+
+
+async def _transcribed(stage, segments: List[Dict], tier: str, on_stage=None,
+                       on_draft: Optional[Callable[[str], None]] = None) -> Tuple[List[Dict], str]:
+    """Turn recognizer segments into the final text, refining if the tier asks"""
+    if tier == "refine":
+        draft = _require_speech(segments_text(segments))
+        if on_draft:
+            on_draft(draft)
+        segments = await stage("refine", refine_stage, segments)
+    else:
+        _skip(on_stage, "refine")
+    return segments, _require_speech(segments_text(segments))
+
+
+async def _summarize_sections(executor, segments: List[Dict], notes_data: Optional[Dict],
+                              on_stage=None, trace: Optional[Trace] = None) -> Dict:
+    """Map-reduce summary of a long recording (see services/summarizer.py).
+
+    Every window is submitted at once to the job executor, so per-task
+    memory follows the window size rather than the lecture length. The
+    windows only run in parallel with NOTEIFY_EXECUTOR=process; the default
+    thread executor keeps them on about one core, since tokenizing and
+    ranking mostly hold the GIL. Paragraphs already built during recognition are kept.
+    """
+    loop = asyncio.get_running_loop()
+    windows = await asyncio.to_thread(split_windows, segments)
+    if on_stage:
+        on_stage("summarize", "running")
+    print(f"📚 Summarizing {len(windows)} sections...")
+
+    submitted = time.time()
+    mapped = await asyncio.gather(*(
+        loop.run_in_executor(executor, timed_call, summarize_window, submitted, None, *window)
+        for window in windows
+    ))
+    reduced = await asyncio.to_thread(reduce_sections, [value for value, _, _ in mapped])
+    if trace:
+        wait = min(wait for _, wait, _ in mapped)
+        trace.span("summarize", time.time() - submitted - wait, wait)
+    if on_stage:
+        on_stage("summarize", "done")
+
+    if notes_data:
+        reduced["full_transcription"] = notes_data["full_transcription"]
+    return reduced
+
+
+async def _finish(stage, segments: List[Dict], transcription_text: str, filename: str,
+                  output_id: str, output_dir: str,
+                  cache: Optional[ResultCache] = None,
+                  content_hash: Optional[str] = None,
+                  tier: str = DEFAULT_TIER,
+                  notes_data: Optional[Dict] = None,
+                  on_stage=None,
+                  renderer: Optional[PdfRenderer] = None,
+                  trace: Optional[Trace] = None,
+                  index: Optional[SearchIndex] = None,
+                  executor=None) -> Dict:
+    if needs_sections(segments):
+        notes_data = await _summarize_sections(executor, segments, notes_data, on_stage, trace)
+    elif notes_data is None:
+        notes_data = await stage("summarize", summarize_stage, transcription_text)
+    elif on_stage:
+        # Already built alongside recognition (see recognize_pcm)
+        on_stage("summarize", "done")
+
+    key = pipeline_cache_key(content_hash, tier) if cache and content_hash else None
+    await asyncio.to_thread(save_notes, output_dir, output_id, notes_data, segments, filename)
+    await asyncio.to_thread(index_notes, index, output_id, filename, notes_data, segments)
+
+    if key:
+        try:
+            await asyncio.to_thread(cache.put, key, notes_data, transcription_text, segments)
+        except OSError as e:
+            print(f"⚠️ Could not cache result: {e}")
+
+    # The PDF is only on the critical path in eager mode; otherwise the
+    # notes JSON above is enough to render it (or any export) later.
+    if renderer is None or PDF_MODE == "eager":
+        rendered = await stage("pdf", render_pdf, output_dir, output_id)
+        if trace:
+            trace.set(pdf_pages=rendered["pages"])
+    else:
+        _deliver_pdf(renderer, output_dir, output_id, on_stage)
+
+    return build_result(filename, notes_data, output_id)
+
+
+async def run_text_pipeline(
+    executor,
+    segments: List[Dict],
+    filename: str,
+    output_dir: str,
+    on_stage: Optional[Callable[[str, str], None]] = None,
+    renderer: Optional[PdfRenderer] = None,
+    trace: Optional[Trace] = None,
+    output_id: Optional[str] = None,
+    index: Optional[SearchIndex] = None,
+) -> Dict:
+    """Summarize and render segments recognized outside the pipeline"""
+    trace = trace or Trace()
+    stage = _stage_runner(executor, on_stage, trace)
+    transcription_text = _require_speech(segments_text(segments))
+    return await _finish(stage, segments, transcription_text, filename, output_id or new_output_id(),
+                         output_dir, on_stage=on_stage, renderer=renderer, trace=trace, index=index,
+                         executor=executor)
+
+
+async def run_pipeline(
+    executor,
+    input_path: str,
+    filename: str,
+    output_dir: str,
+    on_stage: Optional[Callable[[str, str], None]] = None,
+    cache: Optional[ResultCache] = None,
+    content_hash: Optional[str] = None,
+    tier: str = DEFAULT_TIER,
+    on_draft: Optional[Callable[[str], None]] = None,
+    renderer: Optional[PdfRenderer] = None,
+    trace: Optional[Trace] = None,
+    output_id: Optional[str] = None,
+    index: Optional[SearchIndex] = None,
+    admission=None,
+    admission_wait: Optional[float] = None,
+    duration: Optional[float] = None,
+) -> Dict:
+    """Run every stage on ``executor`` without blocking the event loop.
+
+    ``on_stage(stage, state)`` is called with state "running" and "done"
+    (or "skipped") for each stage so callers can publish progress. When
+    ``cache`` and the upload's ``content_hash`` are given, a hit returns
+    the stored notes without running any stage. In the "refine" tier
+    ``on_draft`` receives the fast-model transcript before refinement.
+    With a ``renderer`` the PDF follows NOTEIFY_PDF_MODE instead of being
+    rendered before returning. Stage spans are recorded on ``trace``.
+    Outputs are written to ``output_dir`` under ``output_id`` (a fresh
+    id if omitted); intermediates go next to ``input_path``. The transcript
+    is added to the search ``index`` when one is given. On a cache miss the
+    run waits for a slot from ``admission`` (an AdmissionController), for at
+    most ``admission_wait`` seconds of estimated queueing. A ``duration``
+    the caller already measured is used instead of probing the input again.
+    """
+    check_tier(tier)
+    trace = trace or Trace(tier=tier)
+    stage = _stage_runner(executor, on_stage, trace)
+    file_ext = os.path.splitext(filename)[1]
+    output_id = output_id or new_output_id()
+
+    audio_path = None
+    wav_path = None
+    ticket = None
+    measured = None
+
+    try:
+        trace.set(input_bytes=os.path.getsize(input_path))
+        cached = await asyncio.to_thread(
+            _from_cache, cache, content_hash, tier, filename, output_id,
+            output_dir, on_stage, renderer, trace, index
+        )
+        if cached:
+            return cached
+
+        # Files mode runs ffmpeg to completion before recognition starts, so
+        # long inputs are cut into slices that are transcribed as they land.
+        # (Stream mode already feeds ffmpeg's output straight to the recognizer.)
+        # The probed length also prices the admission ticket.
+        if duration is None and DECODE_MODE == "files" and file_ext in AUDIO_FORMATS | VIDEO_FORMATS:
+            duration = await asyncio.to_thread(probe_duration, input_path)
+
+        ticket = await _admit(admission, admission_wait, trace, filename, tier,
+                              path=input_path, duration=duration)
+
+        if DECODE_MODE == "files" and duration and duration > LONG_INPUT_SECONDS:
+            _skip(on_stage, "extract", "convert")
+            segments = await stage("transcribe", long_transcribe_stage, input_path, duration, tier)
+            notes_data = None
+            audio_seconds = duration
+        elif DECODE_MODE == "stream":
+            if file_ext not in AUDIO_FORMATS | VIDEO_FORMATS:
+                raise PipelineError(400, f"Unsupported file format: {file_ext}")
+            _skip(on_stage, "extract", "convert")
+            segments, notes_data, audio_seconds = await stage(
+                "transcribe", stream_transcribe_stage, input_path, tier, duration
+            )
+        else:
+            audio_path = await stage("extract", extract_stage, input_path, file_ext)
+            wav_path = await stage("convert", convert_stage, audio_path, duration)
+            audio_seconds = wav_seconds(wav_path)
+            segments = await stage("transcribe", transcribe_stage, wav_path, tier)
+            notes_data = None
+        trace.set(audio_seconds=round(audio_seconds, 2))
+
+        segments, transcription_text = await _transcribed(stage, segments, tier, on_stage, on_draft)
+        result = await _finish(stage, segments, transcription_text, filename, output_id,
+                               output_dir, cache, content_hash, tier, notes_data, on_stage,
+                               renderer, trace, index, executor)
+        measured = audio_seconds
+        return result
+    finally:
+        if admission:
+            admission.release(ticket, measured)
+        for path in [input_path, audio_path, wav_path]:
+            try:
+                if path and os.path.exists(path):
+                    os.remove(path)
+            except Exception:
+                pass
+
+
+async def run_streaming_pipeline(
+    executor,
+    body: AsyncIterator[bytes],
+    filename: str,
+    output_dir: str,
+    on_stage: Optional[Callable[[str, str], None]] = None,
+    cache: Optional[ResultCache] = None,
+    tier: str = DEFAULT_TIER,
+    renderer: Optional[PdfRenderer] = None,
+    trace: Optional[Trace] = None,
+    output_id: Optional[str] = None,
+    index: Optional[SearchIndex] = None,
+    admission=None,
+    admission_wait: Optional[float] = None,
+    size: Optional[int] = None,
+) -> Dict:
+    """Pipe an upload body into ffmpeg while it is still being received.
+
+    Nothing touches the disk until the PDF: the encoded bytes go to ffmpeg's
+    stdin and the PCM it emits is fed to the recognizer on a thread.
+    Containers that keep their index at the end (non-faststart MP4) cannot
+    be decoded from a pipe; use /api/process for those. The content hash
+    is only known once the body has been read, so the cache can store the
+    result but a repeat upload still has to be decoded. Admission is
+    decided once the first chunk has arrived, from the body's expected
+    ``size`` and, for a WAV, the length in its header.
+    """
+    check_tier(tier)
+    file_ext = os.path.splitext(filename)[1]
+    if file_ext not in AUDIO_FORMATS | VIDEO_FORMATS:
+        raise PipelineError(400, f"Unsupported file format: {file_ext}")
+
+    loop = asyncio.get_running_loop()
+    trace = trace or Trace(tier=tier)
+    stage = _stage_runner(executor, on_stage, trace)
+    body = body.__aiter__()
+    try:
+        head = await body.__anext__()
+    except StopAsyncIteration:
+        head = b""
+    ticket = await _admit(admission, admission_wait, trace, filename, tier, size=size, header=head)
+    measured = None
+
+    try:
+        decoder = PcmDecoder("pipe:0", extract_timeout(None))
+        digest = hashlib.sha256()
+        input_bytes = 0
+
+        _skip(on_stage, "extract", "convert")
+        if on_stage:
+            on_stage("transcribe", "running")
+
+        try:
+            # The recognizer thread reads ffmpeg's stdout while we feed stdin,
+            # so neither pipe can fill up and stall the other side. It has a
+            # thread of its own: on the default executor, enough concurrent
+            # streams would hold every thread while the writes wait for one.
+            # Its span includes time spent waiting on the client's upload.
+            recognizing = run_on_thread(
+                timed_call, recognize_pcm, time.time(), trace.profile_path("transcribe"),
+                decoder.chunks(), tier
+            )
+
+            async for chunk in _prepend(head, body):
+                if not chunk:
+                    continue
+                digest.update(chunk)
+                input_bytes += len(chunk)
+                if not await loop.run_in_executor(None, decoder.write, chunk):
+                    break
+            decoder.close_input()
+
+            (segments, notes_data, audio_seconds), wait, seconds = await recognizing
+            await loop.run_in_executor(None, decoder.wait)
+        finally:
+            decoder.kill()
+
+        trace.span("transcribe", seconds, wait)
+        trace.set(input_bytes=input_bytes, audio_seconds=round(audio_seconds, 2))
+        if input_bytes and not audio_seconds:
+            # ffmpeg exits cleanly without output when the container's index
+            # is at the end of the file (non-faststart MP4)
+            raise RuntimeError("FFmpeg decoded no audio from the stream; this file needs /api/process")
+
+        if on_stage:
+            on_stage("transcribe", "done")
+
+        segments, transcription_text = await _transcribed(stage, segments, tier, on_stage)
+        result = await _finish(stage, segments, transcription_text, filename, output_id or new_output_id(),
+                               output_dir, cache, digest.hexdigest(), tier, notes_data, on_stage,
+                               renderer, trace, index, executor)
+        measured = audio_seconds
+        return result
+    finally:
+        if admission:
+            admission.release(ticket, measured)
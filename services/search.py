@@ -0,0 +1,249 @@
+"""Full-text search over processed lectures (SQLite FTS5).
+
+Each finished job adds its transcript paragraphs to one index file in a
+single transaction, so the index grows incrementally and queries never
+wait for a rebuild. Every paragraph stores the start time of each of its
+tokens, taken from the recognizer's word timestamps, so a hit can point
+playback at the moment the matched word was spoken.
+
+Paragraph rowids are ``lecture id << PARAGRAPH_BITS | paragraph number``:
+one lecture's rows form a contiguous range that can be replaced, deleted
+or searched on its own without scanning the rest of the index.
+"""
+import array
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from services.outputs import NOTES_SUFFIX, load_notes
+
+SEARCH_ENABLED = os.getenv("NOTEIFY_SEARCH_ENABLED", "1") == "1"
+SEARCH_MAX_RESULTS = 50
+SNIPPET_TOKENS = 24
+PARAGRAPH_BITS = 20
+
+# The tokens FTS5's unicode61 tokenizer produces: runs of letters and digits
+TOKEN_RE = re.compile(r"[^\W_]+")
+QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+ALIGN_LOOKAHEAD = 50
+# Shorter prefixes expand to too many terms to stay fast
+PREFIX_MIN_CHARS = 3
+HIT_START, HIT_END = "\x02", "\x03"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lectures (
+    id INTEGER PRIMARY KEY,
+    output_id TEXT NOT NULL UNIQUE,
+    filename TEXT NOT NULL,
+    duration REAL NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS passages USING fts5(
+    text, start UNINDEXED, times UNINDEXED,
+    tokenize = 'porter unicode61 remove_diacritics 2'
+);
+"""
+
+
+def _word_starts(segments: List[Dict]) -> Iterator[Tuple[str, float]]:
+    """(token, start seconds) for everything the recognizer produced"""
+    for segment in segments:
+        words = segment.get("words")
+        if words:
+            for w in words:
+                for token in TOKEN_RE.findall(w["word"].lower()):
+                    yield token, w["start"]
+        else:
+            # Outputs from before word timestamps: spread the segment evenly
+            tokens = TOKEN_RE.findall(segment["text"].lower())
+            step = (segment["end"] - segment["start"]) / max(len(tokens), 1)
+            for i, token in enumerate(tokens):
+                yield token, segment["start"] + i * step
+
+
+def paragraph_times(paragraphs: List[str], segments: List[Dict]) -> List[array.array]:
+    """Start time (centiseconds) of every token of every paragraph.
+
+    Paragraphs are the recognizer's words in order, minus the ones the
+    punctuation pass drops, so each token is matched to the next
+    recognizer word spelled the same way.
+    """
+    words = list(_word_starts(segments))
+    pos = 0
+    result = []
+    for paragraph in paragraphs:
+        times = array.array("I")
+        for token in TOKEN_RE.findall(paragraph.lower()):
+            for j in range(pos, min(pos + ALIGN_LOOKAHEAD, len(words))):
+                if words[j][0] == token:
+                    pos = j + 1
+                    break
+            seconds = words[pos - 1][1] if pos else 0.0
+            times.append(int(round(seconds * 100)))
+        result.append(times)
+    return result
+
+
+def match_expression(query: str) -> str:
+    """FTS5 query for user input: all words must match, "quoted words"
+    must be adjacent and ``word*`` matches a prefix (of PREFIX_MIN_CHARS+)"""
+    parts = []
+    for phrase, word in QUERY_RE.findall(query):
+        tokens = TOKEN_RE.findall((phrase or word).lower())
+        if not tokens:
+            continue
+        if phrase:
+            parts.append('"' + " ".join(tokens) + '"')
+        else:
+            parts.extend(f'"{t}"' for t in tokens)
+            if word.endswith("*") and len(tokens[-1]) >= PREFIX_MIN_CHARS:
+                parts[-1] += "*"
+    return " ".join(parts)
+
+
+def _lecture_range(lecture_id: int) -> Tuple[int, int]:
+    lo = lecture_id << PARAGRAPH_BITS
+    return lo, lo + (1 << PARAGRAPH_BITS)
+
+
+class SearchIndex:
+    """Persistent inverted index of transcript paragraphs.
+
+    Safe to share between threads and between serve.py workers: each
+    thread gets its own connection and SQLite's WAL mode lets readers run
+    alongside the single writer.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._write_lock:
+            self._db().executescript(SCHEMA)
+
+    def _db(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            # Autocommit; writes open their own transaction
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def _delete(self, db: sqlite3.Connection, output_id: str) -> bool:
+        row = db.execute("SELECT id FROM lectures WHERE output_id = ?", (output_id,)).fetchone()
+        if row is None:
+            return False
+        db.execute("DELETE FROM passages WHERE rowid >= ? AND rowid < ?", _lecture_range(row[0]))
+        db.execute("DELETE FROM lectures WHERE id = ?", (row[0],))
+        return True
+
+    def _write(self, func, *args):
+        with self._write_lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                value = func(db, *args)
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+            return value
+
+    def add(self, output_id: str, filename: str, notes_data: Dict, segments: List[Dict]):
+        """Index (or re-index) one lecture's paragraphs"""
+        paragraphs = notes_data["full_transcription"]
+        if len(paragraphs) >= 1 << PARAGRAPH_BITS:
+            raise ValueError(f"Too many paragraphs to index: {len(paragraphs)}")
+        times = paragraph_times(paragraphs, segments)
+        duration = segments[-1]["end"] if segments else 0.0
+
+        def write(db):
+            self._delete(db, output_id)
+            lecture_id = db.execute(
+                "INSERT INTO lectures (output_id, filename, duration, indexed_at) VALUES (?, ?, ?, ?)",
+                (output_id, filename, duration, time.time()),
+            ).lastrowid
+            lo, _ = _lecture_range(lecture_id)
+            db.executemany(
+                "INSERT INTO passages (rowid, text, start, times) VALUES (?, ?, ?, ?)",
+                [(lo + i, text, t[0] / 100 if t else 0.0, t.tobytes())
+                 for i, (text, t) in enumerate(zip(paragraphs, times)) if text.strip()],
+            )
+
+        self._write(write)
+
+    def remove(self, output_id: str) -> bool:
+        """Drop one lecture (its outputs were deleted); False if it was not indexed"""
+        return self._write(self._delete, output_id)
+
+    def search(self, query: str, limit: int = 20, output_id: Optional[str] = None) -> List[Dict]:
+        """Best-ranked (BM25) paragraphs for ``query``, optionally within one lecture"""
+        match = match_expression(query)
+        if not match:
+            return []
+
+        db = self._db()
+        where, params = "passages MATCH ?", [match]
+        if output_id:
+            row = db.execute("SELECT id FROM lectures WHERE output_id = ?", (output_id,)).fetchone()
+            if row is None:
+                return []
+            where += " AND rowid >= ? AND rowid < ?"
+            params += _lecture_range(row[0])
+
+        # Rank and highlight inside FTS5 first, so only ``limit`` rows are joined
+        rows = db.execute(f"""
+            SELECT hit.rowid, lectures.output_id, lectures.filename, hit.start, hit.times,
+                   hit.marked, hit.snippet, hit.score
+            FROM (
+                SELECT rowid, start, times, bm25(passages) AS score,
+                       highlight(passages, 0, ?, ?) AS marked,
+                       snippet(passages, 0, '<mark>', '</mark>', '…', ?) AS snippet
+                FROM passages WHERE {where} ORDER BY rank LIMIT ?
+            ) AS hit
+            JOIN lectures ON lectures.id = hit.rowid >> {PARAGRAPH_BITS}
+            ORDER BY hit.score
+        """, [HIT_START, HIT_END, SNIPPET_TOKENS, *params, min(limit, SEARCH_MAX_RESULTS)]).fetchall()
+
+        results = []
+        for rowid, lecture, filename, start, blob, marked, snippet, score in rows:
+            times = array.array("I")
+            times.frombytes(blob)
+            # Playback offset: when the first matched token was spoken
+            first_hit = len(TOKEN_RE.findall(marked.partition(HIT_START)[0]))
+            offset = times[first_hit] / 100 if first_hit < len(times) else start
+            results.append({
+                "output_id": lecture,
+                "filename": filename,
+                "paragraph": rowid & ((1 << PARAGRAPH_BITS) - 1),
+                "start": start,
+                "offset": offset,
+                "snippet": snippet,
+                "score": round(-score, 4),
+            })
+        return results
+
+    def backfill(self, output_dir: str) -> int:
+        """Index stored notes that are not in the index yet (e.g. older outputs)"""
+        known = {row[0] for row in self._db().execute("SELECT output_id FROM lectures")}
+        try:
+            names = os.listdir(output_dir)
+        except OSError:
+            return 0
+
+        added = 0
+        for name in names:
+            stem = name[:-len(NOTES_SUFFIX)]
+            if not name.endswith(NOTES_SUFFIX) or stem in known:
+                continue
+            record = load_notes(output_dir, stem)
+            if record:
+                self.add(stem, record["filename"], record["notes"], record["segments"])
+                added += 1
+        return added
@@ -1,36 +1,518 @@
-from vosk import Model, KaldiRecognizer
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import multiprocessing
+import threading
+import numpy as np
 import wave
 import json
 import os
 
-MODEL_PATH = "models/vosk-model-en-us-0.22"
+from services.vad import VAD_ENABLED, frame_rms, gate_chunks
 
-if not os.path.exists(MODEL_PATH):
-    raise RuntimeError(f"VOSK model not found at {MODEL_PATH}")
+# "vosk" for real recognition; "stub" swaps in services/stub_recognizer.py,
+# a deterministic fake used by the benchmarks and for running without models.
+ASR_BACKEND = os.getenv("NOTEIFY_ASR_BACKEND", "vosk")
+if ASR_BACKEND == "stub":
+    from services.stub_recognizer import Model, KaldiRecognizer
+else:
+    from vosk import Model, KaldiRecognizer
 
-model = Model(MODEL_PATH)
+MODEL_PATH = os.getenv("NOTEIFY_MODEL_PATH", "models/vosk-model-en-us-0.22")
+FAST_MODEL_PATH = os.getenv("NOTEIFY_FAST_MODEL_PATH", "models/vosk-model-small-en-us-0.15")
 
+# Recognizer models by name, and the quality tiers a request can pick:
+#   fast     - small model only
+#   accurate - large model only
+#   refine   - small-model draft, then low-confidence utterances re-run
+#              through the large model
+MODEL_PATHS = {"fast": FAST_MODEL_PATH, "accurate": MODEL_PATH}
+QUALITY_TIERS = ("fast", "accurate", "refine")
+DEFAULT_TIER = os.getenv("NOTEIFY_DEFAULT_TIER", "accurate")
+REFINE_CONFIDENCE = float(os.getenv("NOTEIFY_REFINE_CONFIDENCE", "0.85"))
 
-def transcribe_audio(wav_path: str) -> str:
-    wf = wave.open(wav_path, "rb")
+# Parallel mode: >1 splits the WAV at quiet points and fans segments out
+# to forked workers that share the already-loaded model copy-on-write.
+ASR_WORKERS = int(os.getenv("NOTEIFY_ASR_WORKERS", "1"))
+SEGMENT_SECONDS = float(os.getenv("NOTEIFY_SEGMENT_SECONDS", "30"))
+SPLIT_SEARCH_SECONDS = 10.0
+SLICES_IN_FLIGHT_PER_WORKER = 2
+ENERGY_FRAME_SECONDS = 0.03
+READ_FRAMES = 4000
 
-    if wf.getnchannels() != 1:
-        raise ValueError("Audio must be mono WAV")
+# When the default tier's model is loaded:
+#   eager      - at import (serve.py relies on this to share it between workers)
+#   background - on a thread once the app starts; /api/ready is 503 until done
+#   lazy       - on the first request that needs it (dev/test)
+MODEL_LOAD = os.getenv("NOTEIFY_MODEL_LOAD", "eager")
 
-    rec = KaldiRecognizer(model, wf.getframerate())
-    text = ""
+_models: Dict[str, Model] = {}
+_models_lock = threading.Lock()
+_load_error: Optional[str] = None
+
+
+def get_model(name: str = "accurate") -> Model:
+    """Load a model on first use; later calls share the same instance"""
+    with _models_lock:
+        if name not in _models:
+            path = MODEL_PATHS[name]
+            if ASR_BACKEND != "stub" and not os.path.exists(path):
+                raise RuntimeError(f"VOSK model not found at {path}")
+            _models[name] = Model(path)
+        return _models[name]
+
+
+def tier_model_name(tier: str) -> str:
+    if tier not in QUALITY_TIERS:
+        raise ValueError(f"Unknown quality tier: {tier}")
+    return "fast" if tier in ("fast", "refine") else "accurate"
+
+
+def tier_model_paths(tier: str) -> List[str]:
+    """Every model that can contribute to a tier's output (for cache keys)"""
+    if tier == "refine":
+        return [FAST_MODEL_PATH, MODEL_PATH]
+    return [MODEL_PATHS[tier_model_name(tier)]]
+
+
+def warm_models(names: Optional[List[str]] = None):
+    """Load the default tier's models (or ``names``) now; errors are kept for model_status"""
+    global _load_error
+    try:
+        for name in names or [tier_model_name(DEFAULT_TIER)]:
+            get_model(name)
+        _load_error = None
+    except Exception as e:
+        _load_error = str(e)
+        raise
+
+
+def model_status() -> Dict:
+    """Readiness: whether the default tier can recognize without loading first"""
+    loaded = sorted(dict(_models))  # no lock: a background load holds it for minutes
+    warm = tier_model_name(DEFAULT_TIER) in loaded
+    return {
+        "ready": warm or (MODEL_LOAD == "lazy" and _load_error is None),
+        "warm": warm,
+        "load_mode": MODEL_LOAD,
+        "loaded_models": loaded,
+        "error": _load_error,
+    }
+
+
+# Other tiers always load on first use
+if MODEL_LOAD == "eager":
+    warm_models()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def start_pool(workers: int = ASR_WORKERS) -> ProcessPoolExecutor:
+    """Fork the parallel-ASR pool once; later calls share it.
+
+    Every installed model is loaded first so the workers inherit them
+    copy-on-write (a model loaded after the fork is reloaded per worker).
+    The app calls this at startup; lazy loading creates it on first use.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            for name, path in MODEL_PATHS.items():
+                if ASR_BACKEND == "stub" or os.path.exists(path):
+                    get_model(name)
+            # fork (not spawn) so children inherit the loaded models instead of reloading them
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("fork"),
+            )
+            # A fork pool starts all its workers on the first submit; do that
+            # now, before callers start threads whose held locks a child
+            # would inherit (see transcribe_slices).
+            _pool.submit(os.getpid).result()
+        return _pool
+
+
+def _submit(workers: int, func, *args) -> Future:
+    """Submit to the fork pool, re-forking it if a worker has died.
+
+    A dead worker (e.g. OOM-killed) breaks the whole pool for good; the
+    tasks it had fail, but later ones get a fresh pool.
+    """
+    pool = start_pool(workers)
+    try:
+        return pool.submit(func, *args)
+    except BrokenProcessPool:
+        global _pool
+        with _pool_lock:
+            if _pool is pool:
+                print("⚠️ ASR worker pool broke, forking a new one")
+                pool.shutdown(wait=False, cancel_futures=True)
+                _pool = None
+        return start_pool(workers).submit(func, *args)
+
+
+class LiveRecognizer:
+    """One KaldiRecognizer fed incrementally, tracking segment offsets.
+
+    ``start`` is the frame offset of the first chunk in the whole recording.
+    With ``partials`` on, :meth:`accept` also reports changed partial text.
+    Segments carry their "words" with start/end times in the recording.
+    In the "refine" tier every segment gets a word-confidence score and the
+    audio of low-confidence ones is kept for :func:`refine_segments`.
+    """
+
+    def __init__(self, rate: int = 16000, start: int = 0, frame_bytes: int = 2,
+                 partials: bool = False, tier: str = DEFAULT_TIER):
+        self.rec = KaldiRecognizer(get_model(tier_model_name(tier)), rate)
+        self.rate = rate
+        self.frame_bytes = frame_bytes
+        self.partials = partials
+        self.position = start
+        self.segment_start = start
+        # Frames actually fed: the recognizer's own clock, which stops
+        # while VAD skips audio
+        self.fed = 0
+        self.segment_fed = 0
+        self.segments: List[Dict] = []
+        self._last_partial = ""
+
+        self.refine = tier == "refine"
+        self._utterance: List[bytes] = []
+        self.rec.SetWords(True)
+
+    def _segment(self, result_json: str) -> Optional[Dict]:
+        result = json.loads(result_json)
+        text = result.get("text", "")
+        words = result.get("result", [])
+        # A segment never spans a skip, so one shift maps its words back
+        shift = (self.segment_start - self.segment_fed) / self.rate
+        segment = {
+            "start": self.segment_start / self.rate,
+            "end": self.position / self.rate,
+            "text": text,
+            "words": _shift_words(words, shift),
+        }
+
+        if self.refine and text:
+            segment["conf"] = sum(w["conf"] for w in words) / len(words) if words else 0.0
+            if segment["conf"] < REFINE_CONFIDENCE:
+                segment["audio"] = b"".join(self._utterance)
+
+        self.segment_start = self.position
+        self.segment_fed = self.fed
+        self._last_partial = ""
+        self._utterance = []
+        if not text:
+            return None
+        self.segments.append(segment)
+        return segment
+
+    @staticmethod
+    def _event(segment: Optional[Dict]) -> Optional[Dict]:
+        if not segment:
+            return None
+        return {"type": "result", "start": segment["start"], "end": segment["end"],
+                "text": segment["text"]}
+
+    def accept(self, data: bytes) -> Optional[Dict]:
+        """Feed PCM; returns {"type": "result"|"partial", ...} or None"""
+        self.position += len(data) // self.frame_bytes
+        self.fed += len(data) // self.frame_bytes
+        if self.refine:
+            self._utterance.append(data)
+
+        if self.rec.AcceptWaveform(data):
+            return self._event(self._segment(self.rec.Result()))
+
+        if self.partials:
+            partial = json.loads(self.rec.PartialResult()).get("partial", "")
+            if partial and partial != self._last_partial:
+                self._last_partial = partial
+                return {"type": "partial", "text": partial}
+        return None
+
+    def finish(self) -> Optional[Dict]:
+        return self._event(self._segment(self.rec.FinalResult()))
+
+    def skip(self, frames: int) -> Optional[Dict]:
+        """Jump over ``frames`` of audio that is not fed (silence cut by VAD).
+
+        The pending utterance ends at the gap, so later segments keep their
+        offsets in the original recording.
+        """
+        event = self.finish()
+        self.position += frames
+        self.segment_start = self.position
+        return event
+
+    @property
+    def text(self) -> str:
+        return " ".join(s["text"] for s in self.segments)
+
+
+def _shift_words(words: List[Dict], seconds: float) -> List[Dict]:
+    return [{"word": w["word"], "start": round(w["start"] + seconds, 2),
+             "end": round(w["end"] + seconds, 2)} for w in words]
+
+
+def refine_segments(segments: List[Dict], rate: int = 16000) -> List[Dict]:
+    """Re-recognize segments that kept their audio with the accurate model"""
+    for segment in segments:
+        audio = segment.pop("audio", None)
+        if audio is None:
+            continue
+
+        rec = KaldiRecognizer(get_model("accurate"), rate)
+        rec.SetWords(True)
+        results = []
+        for i in range(0, len(audio), READ_FRAMES * 2):
+            if rec.AcceptWaveform(audio[i:i + READ_FRAMES * 2]):
+                results.append(json.loads(rec.Result()))
+        results.append(json.loads(rec.FinalResult()))
+
+        text = " ".join(r["text"] for r in results if r.get("text"))
+        if text:
+            segment["text"] = text
+            segment["words"] = _shift_words([w for r in results for w in r.get("result", [])],
+                                            segment["start"])
+            segment["refined"] = True
+    return segments
+
+
+def iter_segments(chunks: Iterable[bytes], rate: int = 16000, start: int = 0,
+                  frame_bytes: int = 2, tier: str = DEFAULT_TIER) -> Iterator[Dict]:
+    """Yield timed segments as the recognizer finalizes them.
+
+    With VAD on, long silences in 16-bit mono input are skipped, not fed.
+    The recognizer is created at the first audio that gets through, so
+    input the gate finds silent never reaches ASR at all.
+    """
+    if VAD_ENABLED and frame_bytes == 2:
+        chunks = gate_chunks(chunks, rate)
+
+    live = None
+    for data in chunks:
+        if isinstance(data, int):
+            if live is None:
+                start += data
+                continue
+            event = live.skip(data)
+        else:
+            if live is None:
+                live = LiveRecognizer(rate, start, frame_bytes, tier=tier)
+            event = live.accept(data)
+        if event:
+            yield live.segments[-1]
+    if live and live.finish():
+        yield live.segments[-1]
+
+
+def _recognize_chunks(chunks: Iterable[bytes], rate: int, start: int = 0,
+                      frame_bytes: int = 2, tier: str = DEFAULT_TIER) -> List[Dict]:
+    """Feed PCM chunks to one recognizer and return timed segments"""
+    return list(iter_segments(chunks, rate, start, frame_bytes, tier))
+
+
+def _wav_chunks(wf, start: int, end: int) -> Iterator[bytes]:
+    wf.setpos(start)
+    position = start
+    while position < end:
+        data = wf.readframes(min(READ_FRAMES, end - position))
+        if len(data) == 0:
+            break
+        position += len(data) // (wf.getsampwidth() * wf.getnchannels())
+        yield data
+
+
+def _recognize(wf, start: int, end: int, tier: str = DEFAULT_TIER) -> List[Dict]:
+    """Run one recognizer over frames [start, end) and return timed segments"""
+    return _recognize_chunks(
+        _wav_chunks(wf, start, end), wf.getframerate(), start,
+        wf.getsampwidth() * wf.getnchannels(), tier,
+    )
+
+
+def _transcribe_range(wav_path: str, start: int, end: int, tier: str) -> List[Dict]:
+    with wave.open(wav_path, "rb") as wf:
+        return _recognize(wf, start, end, tier)
+
+
+def _frame_energy(wf, frame_len: int) -> np.ndarray:
+    """RMS energy per analysis frame, computed block by block"""
+    energies = []
+    block_frames = frame_len * 1000
+    wf.rewind()
 
     while True:
-        data = wf.readframes(4000)
+        data = wf.readframes(block_frames)
         if len(data) == 0:
             break
+        samples = np.frombuffer(data, dtype="<i2")
+        if len(samples) < frame_len:
+            break
+        energies.append(frame_rms(samples, frame_len))
+
+    return np.concatenate(energies) if energies else np.zeros(0, dtype=np.float32)
+
+
+def find_split_points(wf, segment_seconds: float = SEGMENT_SECONDS) -> List[Tuple[int, int]]:
+    """Split the WAV into ~segment_seconds ranges, cutting at the quietest
+    frame inside a search window so no word is chopped in half."""
+    rate = wf.getframerate()
+    total = wf.getnframes()
+    frame_len = max(int(rate * ENERGY_FRAME_SECONDS), 1)
+    energy = _frame_energy(wf, frame_len)
+
+    target = int(segment_seconds / ENERGY_FRAME_SECONDS)
+    window = int(SPLIT_SEARCH_SECONDS / ENERGY_FRAME_SECONDS)
+
+    ranges = []
+    start_frame = 0
+    while start_frame + target + window < len(energy):
+        lo = start_frame + target
+        cut = lo + int(np.argmin(energy[lo:lo + window]))
+        ranges.append((start_frame * frame_len, cut * frame_len))
+        start_frame = cut
+
+    ranges.append((start_frame * frame_len, total))
+    return ranges
+
+
+def transcribe_segments(wav_path: str, workers: int = ASR_WORKERS,
+                        tier: str = DEFAULT_TIER) -> List[Dict]:
+    """Transcribe into ordered segments with start/end offsets in seconds.
+
+    In the "refine" tier low-confidence segments still carry their raw
+    "audio"; pass the list through :func:`refine_segments` to finish it.
+    """
+    with wave.open(wav_path, "rb") as wf:
+        if wf.getnchannels() != 1:
+            raise ValueError("Audio must be mono WAV")
+
+        too_short = wf.getnframes() < 2 * SEGMENT_SECONDS * wf.getframerate()
+        if workers <= 1 or too_short or wf.getsampwidth() != 2:
+            return _recognize(wf, 0, wf.getnframes(), tier)
+
+        ranges = find_split_points(wf)
+
+    futures = [_submit(workers, _transcribe_range, wav_path, start, end, tier) for start, end in ranges]
+
+    segments = []
+    for future in futures:
+        segments.extend(future.result())
+    return segments
+
+
+def _transcribe_slice(wav_path: str, offset: float, start: float, end: Optional[float],
+                      tier: str) -> List[Dict]:
+    """Transcribe [start, end) seconds of one extracted slice (end None = to
+    its end), then delete it and shift its segments by ``offset``"""
+    try:
+        with wave.open(wav_path, "rb") as wf:
+            rate = wf.getframerate()
+            last = wf.getnframes() if end is None else min(int(end * rate), wf.getnframes())
+            segments = _recognize(wf, min(int(start * rate), last), last, tier)
+    finally:
+        os.remove(wav_path)
+
+    for segment in segments:
+        segment["start"] += offset
+        segment["end"] += offset
+        segment["words"] = _shift_words(segment["words"], offset)
+    return segments
+
+
+def _quietest_point(wav_path: str, search_from: float) -> float:
+    """Seconds into the WAV of the quietest analysis frame after ``search_from``"""
+    with wave.open(wav_path, "rb") as wf:
+        rate = wf.getframerate()
+        first = min(int(search_from * rate), wf.getnframes())
+        if wf.getsampwidth() != 2 or wf.getnchannels() != 1:
+            return first / rate
+        wf.setpos(first)
+        samples = np.frombuffer(wf.readframes(wf.getnframes() - first), dtype="<i2")
+
+    frame_len = max(int(rate * ENERGY_FRAME_SECONDS), 1)
+    energy = frame_rms(samples, frame_len)
+    if len(energy) == 0:
+        return first / rate
+    return (first + int(np.argmin(energy)) * frame_len) / rate
+
+
+def _cut_at_silence(slices: Iterable[Tuple[float, str]]) -> Iterator[Tuple[str, float, float, Optional[float]]]:
+    """Turn overlapping (offset, WAV path) slices into (path, offset, start,
+    end) ranges whose boundaries sit at the quietest point of each overlap.
+
+    A slice is held until the next one arrives: only then is it known to
+    overlap something, and its tail is searched for the cut.
+    """
+    pending = None
+    start = 0.0
+    try:
+        for offset, wav_path in slices:
+            if pending:
+                prev_offset, prev_path = pending
+                overlap_from = offset - prev_offset
+                cut = _quietest_point(prev_path, overlap_from)
+                pending = None
+                yield prev_path, prev_offset, start, cut
+                start = max(cut - overlap_from, 0.0)
+            pending = (offset, wav_path)
+        if pending:
+            offset, wav_path = pending
+            pending = None
+            yield wav_path, offset, start, None
+    finally:
+        if pending:
+            try:
+                os.remove(pending[1])
+            except OSError:
+                pass
+
+
+def transcribe_slices(slices: Iterable[Tuple[float, str]], workers: int = ASR_WORKERS,
+                      tier: str = DEFAULT_TIER) -> List[Dict]:
+    """Transcribe overlapping (offset seconds, WAV path) slices as they
+    become available, cutting between them at silence (see iter_slices).
+
+    With workers > 1 each slice goes to the fork pool as soon as it is cut,
+    so recognition overlaps extraction of the slices after it. At most
+    SLICES_IN_FLIGHT_PER_WORKER slices per worker are submitted ahead of
+    the results, so extraction stays bounded by the recognizers' pace.
+    """
+    ranges = _cut_at_silence(slices)
+    segments = []
+    if workers <= 1:
+        for wav_path, offset, start, end in ranges:
+            segments.extend(_transcribe_slice(wav_path, offset, start, end, tier))
+        return segments
+
+    in_flight = deque()
+    try:
+        for wav_path, offset, start, end in ranges:
+            if len(in_flight) >= SLICES_IN_FLIGHT_PER_WORKER * workers:
+                segments.extend(in_flight.popleft().result())
+            in_flight.append(_submit(workers, _transcribe_slice, wav_path, offset, start, end, tier))
+        while in_flight:
+            segments.extend(in_flight.popleft().result())
+    finally:
+        for future in in_flight:
+            future.cancel()
+    return segments
+
 
-        if rec.AcceptWaveform(data):
-            result = json.loads(rec.Result())
-            text += result.get("text", "") + " "
+def transcribe_audio(wav_path: str, workers: int = ASR_WORKERS,
+                     tier: str = DEFAULT_TIER) -> str:
+    segments = transcribe_segments(wav_path, workers, tier)
+    if tier == "refine":
+        with wave.open(wav_path, "rb") as wf:
+            segments = refine_segments(segments, wf.getframerate())
+    return " ".join(s["text"] for s in segments).strip()
 
-    final = json.loads(rec.FinalResult())
-    text += final.get("text", "")
 
-    wf.close()
-    return text.strip()
+def transcribe_stream(chunks: Iterable[bytes], rate: int = 16000,
+                      tier: str = DEFAULT_TIER) -> List[Dict]:
+    """Transcribe 16-bit mono PCM as it arrives (e.g. from an ffmpeg pipe)"""
+    return _recognize_chunks(chunks, rate, tier=tier)
@@ -0,0 +1,136 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+
+try:
+    import brotli  # optional: pip install brotli
+except ImportError:
+    brotli = None
+
+# Vite puts content-hashed bundles in assets/ ("index-C0gtM1o3.js"); those
+# never change under the same name, everything else is revalidated.
+IMMUTABLE_RE = re.compile(r"^assets/.+-[A-Za-z0-9_-]{8,}\.\w+$")
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+# Bigger files are streamed from disk instead of being held in memory
+INLINE_MAX_BYTES = 8 * 1024 * 1024
+
+COMPRESSIBLE_TYPES = {
+    "application/javascript", "application/json", "application/manifest+json",
+    "application/xml", "image/svg+xml", "text/javascript",
+}
+ENCODINGS = ("br", "gzip")
+PRECOMPRESSED_SUFFIXES = {".br": "br", ".gz": "gzip"}
+
+
+class StaticAsset:
+    def __init__(self, path: str, rel_path: str):
+        self.path = path
+        self.content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.cache_control = IMMUTABLE_CACHE if IMMUTABLE_RE.match(rel_path) else REVALIDATE_CACHE
+        self.bodies: Dict[str, bytes] = {}   # encoding ("identity", "gzip", "br") -> bytes
+
+        size = os.path.getsize(path)
+        if size > INLINE_MAX_BYTES:
+            stat = os.stat(path)
+            self.etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+            return
+
+        with open(path, "rb") as f:
+            data = f.read()
+        self.bodies["identity"] = data
+        self.etag = f'"{hashlib.sha256(data).hexdigest()[:20]}"'
+
+        for suffix, encoding in PRECOMPRESSED_SUFFIXES.items():
+            if os.path.exists(path + suffix):
+                with open(path + suffix, "rb") as f:
+                    self.bodies[encoding] = f.read()
+
+        if self.content_type.startswith("text/") or self.content_type in COMPRESSIBLE_TYPES:
+            if "gzip" not in self.bodies:
+                self._add_variant("gzip", gzip.compress(data, 9, mtime=0))
+            if "br" not in self.bodies and brotli:
+                self._add_variant("br", brotli.compress(data))
+
+    def _add_variant(self, encoding: str, body: bytes):
+        if len(body) < len(self.bodies["identity"]):
+            self.bodies[encoding] = body
+
+    def etag_for(self, encoding: str) -> str:
+        # Each representation needs its own strong validator
+        return self.etag if encoding == "identity" else f'{self.etag[:-1]}-{encoding}"'
+
+
+def _accepted_encodings(header: str) -> set:
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+class StaticSite:
+    """The frontend build, indexed (and compressed) once at startup.
+
+    Content-hashed bundles are served as immutable; everything else,
+    index.html included, carries an ETag so browsers revalidate cheaply.
+    Unknown paths fall back to index.html for client-side routing.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.assets: Dict[str, StaticAsset] = {}
+        for dirpath, _, filenames in os.walk(root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                base, suffix = os.path.splitext(path)
+                if suffix in PRECOMPRESSED_SUFFIXES and os.path.exists(base):
+                    continue  # a variant of ``base``, picked up with it
+                rel_path = os.path.relpath(path, root).replace(os.sep, "/")
+                self.assets[rel_path] = StaticAsset(path, rel_path)
+
+        compressed = sum(1 for a in self.assets.values() if len(a.bodies) > 1)
+        print(f"🗂️ Indexed {len(self.assets)} static files ({compressed} precompressed)")
+
+    def get(self, rel_path: str) -> Optional[StaticAsset]:
+        return self.assets.get(rel_path.lstrip("/"))
+
+    def serve(self, request: Request, rel_path: str, fallback: Optional[str] = "index.html") -> Response:
+        asset = self.get(rel_path) or (self.get(fallback) if fallback else None)
+        if asset is None:
+            return Response(status_code=404)
+
+        encoding = "identity"
+        if len(asset.bodies) > 1:
+            accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+            encoding = next((e for e in ENCODINGS if e in accepted and e in asset.bodies), "identity")
+
+        etag = asset.etag_for(encoding)
+        headers = {"ETag": etag, "Cache-Control": asset.cache_control}
+        if len(asset.bodies) > 1:
+            headers["Vary"] = "Accept-Encoding"
+
+        if_none_match = request.headers.get("if-none-match", "")
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        if if_none_match.strip() == "*" or etag in tags:
+            return Response(status_code=304, headers=headers)
+
+        if not asset.bodies:
+            return FileResponse(asset.path, media_type=asset.content_type, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(asset.bodies[encoding], media_type=asset.content_type, headers=headers)
@@ -0,0 +1,98 @@
+"""Deterministic stand-in for the Vosk API (NOTEIFY_ASR_BACKEND=stub).
+
+Mirrors the small part of ``vosk.Model`` / ``vosk.KaldiRecognizer`` that
+services/speech_to_text.py uses, so the pipeline and the benchmarks run
+without a model download. Utterances end at a stretch of silence (or
+after MAX_UTTERANCE_SECONDS) and their words are drawn from a fixed
+lecture vocabulary, so the same audio always gives the same transcript.
+"""
+import json
+import zlib
+
+import numpy as np
+
+SILENCE_RMS = 300.0
+SILENCE_SECONDS = 0.3
+MAX_UTTERANCE_SECONDS = 10.0
+WORDS_PER_SECOND = 2.5
+
+VOCABULARY = (
+    "today we look at eigenvalues and eigenvectors of a symmetric matrix "
+    "the spectral theorem says every real symmetric matrix can be diagonalized "
+    "by an orthogonal change of basis so the eigenvalues are real and the "
+    "eigenvectors for distinct eigenvalues are orthogonal this matters for "
+    "principal component analysis where the covariance matrix is symmetric "
+    "and its leading eigenvectors give the directions of largest variance"
+).split()
+
+
+class Model:
+    def __init__(self, path: str):
+        self.path = path
+
+
+class KaldiRecognizer:
+    def __init__(self, model: Model, rate: float):
+        self.rate = int(rate)
+        self.words = False
+        self._frames = 0        # frames in the current utterance
+        self._voiced = 0        # voiced frames in the current utterance
+        self._silence = 0       # trailing silent frames
+        self._position = 0      # frames since the recognizer was created
+        self._utterances = 0
+        self._seed = zlib.crc32(model.path.encode())
+
+    def SetWords(self, enabled: bool):
+        self.words = enabled
+
+    def AcceptWaveform(self, data: bytes) -> bool:
+        samples = np.frombuffer(data[:len(data) - len(data) % 2], dtype="<i2").astype(np.float32)
+        n = len(samples)
+        if n == 0:
+            return False
+
+        rms = float(np.sqrt(np.mean(samples * samples)))
+        self._frames += n
+        self._position += n
+        if rms < SILENCE_RMS:
+            self._silence += n
+        else:
+            self._silence = 0
+            self._voiced += n
+
+        ended_by_pause = self._voiced and self._silence >= SILENCE_SECONDS * self.rate
+        return bool(ended_by_pause or self._frames >= MAX_UTTERANCE_SECONDS * self.rate)
+
+    def _words(self):
+        count = int(self._voiced / self.rate * WORDS_PER_SECOND)
+        start = (self._position - self._frames) / self.rate
+        step = (self._voiced / self.rate) / count if count else 0.0
+        seed = zlib.crc32(str(self._utterances).encode(), self._seed)
+
+        words = []
+        for i in range(count):
+            word = VOCABULARY[(seed + i * 7) % len(VOCABULARY)]
+            conf = 0.6 + ((seed >> (i % 16)) % 40) / 100
+            words.append({"word": word, "start": round(start + i * step, 2),
+                          "end": round(start + (i + 1) * step, 2), "conf": conf})
+        return words
+
+    def _result(self) -> str:
+        words = self._words()
+        result = {"text": " ".join(w["word"] for w in words)}
+        if self.words and words:
+            result["result"] = words
+
+        self._utterances += 1
+        self._frames = self._voiced = self._silence = 0
+        return json.dumps(result)
+
+    def Result(self) -> str:
+        return self._result()
+
+    def FinalResult(self) -> str:
+        return self._result()
+
+    def PartialResult(self) -> str:
+        words = self._words()
+        return json.dumps({"partial": " ".join(w["word"] for w in words)})
@@ -1,38 +1,66 @@
 import re
-from typing import List
+from typing import Iterable, Iterator, List
 
+CONJUNCTIONS = re.compile(r"(?:\band\b|\bso\b|\bbut\b)")
+PARAGRAPH_WORDS = 70
 
-def restore_punctuation(text: str) -> str:
-    text = text.strip()
-    text = re.sub(r"\s+", " ", text)
 
-    sentences = re.split(r"(?:\band\b|\bso\b|\bbut\b)", text)
+def iter_sentences(pieces: Iterable[str]) -> Iterator[str]:
+    """Yield punctuated sentences from transcript text arriving in pieces.
 
-    formatted = []
-    for s in sentences:
-        s = s.strip()
+    Pieces (e.g. recognizer segments) are treated as if joined by spaces;
+    a sentence is emitted as soon as the conjunction that ends it is seen.
+    """
+    buffer: List[str] = []
+
+    def flush():
+        s = " ".join(buffer)
+        buffer.clear()
         if len(s) < 15:
-            continue
+            return None
         s = s.capitalize()
         if not s.endswith((".", "!", "?")):
             s += "."
-        formatted.append(s)
+        return s
 
-    return " ".join(formatted)
+    for piece in pieces:
+        for word in piece.split():
+            parts = CONJUNCTIONS.split(word)
+            if parts[0]:
+                buffer.append(parts[0])
+            for part in parts[1:]:
+                sentence = flush()
+                if sentence:
+                    yield sentence
+                if part:
+                    buffer.append(part)
 
+    sentence = flush()
+    if sentence:
+        yield sentence
 
-def split_paragraphs(text: str) -> List[str]:
-    sentences = re.split(r"(?<=[.!?])\s+", text)
-    paragraphs = []
-    buffer = []
+
+def iter_paragraphs(sentences: Iterable[str], max_words: int = PARAGRAPH_WORDS) -> Iterator[str]:
+    """Group sentences into paragraphs, yielding each once it passes max_words"""
+    buffer: List[str] = []
+    words = 0
 
     for s in sentences:
         buffer.append(s)
-        if len(" ".join(buffer).split()) > 70:
-            paragraphs.append(" ".join(buffer))
+        words += len(s.split())
+        if words > max_words:
+            yield " ".join(buffer)
             buffer = []
+            words = 0
 
     if buffer:
-        paragraphs.append(" ".join(buffer))
+        yield " ".join(buffer)
 
-    return paragraphs
+
+def restore_punctuation(text: str) -> str:
+    return " ".join(iter_sentences([text]))
+
+
+def split_paragraphs(text: str) -> List[str]:
+    sentences = re.split(r"(?<=[.!?])\s+", text)
+    return list(iter_paragraphs(sentences))
@@ -0,0 +1,269 @@
+import asyncio
+import hashlib
+import math
+import os
+import re
+import time
+import uuid
+from typing import AsyncIterator, Dict, Optional
+
+from services.jobs import JobManager
+from services.metrics import Trace
+from services.outputs import load_notes, notes_path, pdf_path
+from services.pipeline import (
+    AUDIO_FORMATS,
+    DECODE_MODE,
+    VIDEO_FORMATS,
+    PipelineError,
+    check_tier,
+    index_notes,
+    run_pipeline,
+    run_streaming_pipeline,
+)
+from services.speech_to_text import DEFAULT_TIER
+from services.workspace import Workspaces
+
+UPLOAD_MAX_BYTES = int(os.getenv("NOTEIFY_UPLOAD_MAX_BYTES", str(8 * 1024 ** 3)))
+UPLOAD_CHUNK_BYTES = int(os.getenv("NOTEIFY_UPLOAD_CHUNK_BYTES", str(8 * 1024 * 1024)))
+UPLOAD_TTL_SECONDS = int(os.getenv("NOTEIFY_UPLOAD_TTL", "86400"))
+
+# Start decoding and recognizing while the chunks are still arriving (stream
+# decode mode only). Containers that cannot be read from a pipe fall back to
+# the normal pipeline once the upload is complete.
+UPLOAD_EARLY_START = os.getenv("NOTEIFY_UPLOAD_EARLY_START", "1") == "1"
+# An early start that gets no chunk for this long gives back its admission
+# slot, ffmpeg process and thread; the upload is processed at finalize.
+UPLOAD_IDLE_SECONDS = float(os.getenv("NOTEIFY_UPLOAD_IDLE_SECONDS", "120"))
+
+TAIL_READ_BYTES = 1024 * 1024
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class UploadStalled(Exception):
+    """No chunk arrived for UPLOAD_IDLE_SECONDS while the upload was being processed"""
+
+
+class UploadSession:
+    def __init__(self, filename: str, size: int, sha256: Optional[str], tier: str, workspaces: Workspaces):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.size = size
+        self.sha256 = sha256
+        self.tier = tier
+        self.workspace = workspaces.create(self.id)
+        self.path = self.workspace.path(filename)
+        open(self.path, "wb").close()
+
+        # Chunks must arrive in order, so the hash is computed as they land
+        self.offset = 0
+        self.digest = hashlib.sha256()
+        self.closed = False
+        self.updated_at = time.time()
+        self.trace = Trace("/api/uploads", tier)
+        self.early: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._grew = asyncio.Event()
+
+    @property
+    def complete(self) -> bool:
+        return self.offset == self.size
+
+    def _append(self, f, data: bytes):
+        f.write(data)
+        f.flush()  # tail() reads through its own file handle
+        self.digest.update(data)
+
+    async def write(self, offset: int, body: AsyncIterator[bytes]) -> int:
+        """Append a chunk that starts at ``offset``; returns the new offset.
+
+        Bytes the server already has (a retried chunk) are skipped, so a
+        client may resend from any offset up to the current one. If the
+        connection drops mid-chunk, everything received so far is kept.
+        """
+        async with self._lock:
+            if offset > self.offset:
+                raise PipelineError(409, f"Upload is at offset {self.offset}, not {offset}")
+            skip = self.offset - offset
+
+            with open(self.path, "r+b") as f:
+                f.seek(self.offset)
+                try:
+                    async for chunk in body:
+                        if skip:
+                            dropped = min(skip, len(chunk))
+                            chunk, skip = chunk[dropped:], skip - dropped
+                        if not chunk:
+                            continue
+                        if self.offset + len(chunk) > self.size:
+                            raise PipelineError(413, f"Upload is larger than the declared {self.size} bytes")
+                        await asyncio.to_thread(self._append, f, chunk)
+                        self.offset += len(chunk)
+                        self._grew.set()
+                finally:
+                    self.updated_at = time.time()
+            return self.offset
+
+    async def tail(self) -> AsyncIterator[bytes]:
+        """The upload's bytes in order, waiting for chunks still to come"""
+        fed = 0
+        with open(self.path, "rb") as f:
+            while True:
+                if fed < self.offset:
+                    data = await asyncio.to_thread(f.read, min(self.offset - fed, TAIL_READ_BYTES))
+                    fed += len(data)
+                    yield data
+                elif self.complete or self.closed:
+                    return
+                else:
+                    self._grew.clear()
+                    try:
+                        await asyncio.wait_for(self._grew.wait(), UPLOAD_IDLE_SECONDS)
+                    except asyncio.TimeoutError:
+                        raise UploadStalled(f"No data for {UPLOAD_IDLE_SECONDS:.0f}s at offset {self.offset}")
+
+    def close(self):
+        self.closed = True
+        self._grew.set()
+        if self.early:
+            if not self.early.done():
+                self.early.cancel()
+            elif not self.early.cancelled():
+                self.early.exception()  # mark a failure as retrieved
+        self.workspace.close()
+
+    def to_dict(self) -> Dict:
+        return {
+            "upload_id": self.id,
+            "filename": self.filename,
+            "size": self.size,
+            "offset": self.offset,
+            "complete": self.complete,
+            "chunk_size": UPLOAD_CHUNK_BYTES,
+            "upload_url": f"/api/uploads/{self.id}",
+            "finalize_url": f"/api/uploads/{self.id}/finalize",
+        }
+
+
+class UploadManager:
+    """Resumable uploads: create, append chunks, query the offset, finalize"""
+
+    def __init__(self, jobs: JobManager, workspaces: Workspaces, output_dir: str):
+        self.jobs = jobs
+        self.workspaces = workspaces
+        self.output_dir = output_dir
+        self.sessions: Dict[str, UploadSession] = {}
+
+    def create(self, filename: str, size: int, sha256: Optional[str] = None,
+               tier: str = DEFAULT_TIER) -> UploadSession:
+        self.prune()
+        check_tier(tier)
+        file_ext = os.path.splitext(filename)[1]
+        if file_ext not in AUDIO_FORMATS | VIDEO_FORMATS:
+            raise PipelineError(400, f"Unsupported file format: {file_ext}")
+        if not 0 < size <= UPLOAD_MAX_BYTES:
+            raise PipelineError(413, f"Upload size must be between 1 and {UPLOAD_MAX_BYTES} bytes")
+        if sha256 is not None and not _SHA256_RE.match(sha256.lower()):
+            raise PipelineError(400, "sha256 must be 64 hex digits")
+        # Turn the client away before it sends gigabytes the node cannot take on
+        cost = self.jobs.admission.estimate(filename, tier, size=size)
+        self.jobs.admission.check(cost)
+
+        session = UploadSession(filename, size, sha256 and sha256.lower(), tier, self.workspaces)
+        self.sessions[session.id] = session
+
+        # Only if a slot is free right away; otherwise the upload is
+        # processed at finalize, queueing for a slot there. The transcript
+        # is indexed at finalize, once the upload's hash has been checked.
+        if UPLOAD_EARLY_START and DECODE_MODE == "stream" and self.jobs.admission.has_room(cost):
+            session.early = asyncio.create_task(run_streaming_pipeline(
+                self.jobs.executor, session.tail(), filename, self.output_dir,
+                cache=self.jobs.cache, tier=tier, renderer=self.jobs.renderer,
+                trace=session.trace, output_id=session.id,
+                admission=self.jobs.admission, admission_wait=0, size=size,
+            ))
+        return session
+
+    def get(self, upload_id: str) -> Optional[UploadSession]:
+        return self.sessions.get(upload_id)
+
+    def discard(self, session: UploadSession, status: int = 499):
+        self.sessions.pop(session.id, None)
+        session.close()
+        session.trace.finish(status)
+
+    async def finalize(self, session: UploadSession, sha256: Optional[str] = None) -> Dict:
+        """Verify the assembled file and return the pipeline result for it"""
+        if not session.complete:
+            raise PipelineError(409, f"Upload is incomplete: {session.offset} of {session.size} bytes")
+
+        expected = (sha256 or session.sha256 or "").lower()
+        actual = session.digest.hexdigest()
+        if expected and expected != actual:
+            self.discard(session, 422)
+            await self._drop_early_outputs(session)
+            raise PipelineError(422, f"SHA-256 mismatch: expected {expected}, received {actual}")
+
+        self.sessions.pop(session.id, None)
+        status = 500
+        try:
+            result = None
+            if session.early:
+                try:
+                    result = await session.early
+                except PipelineError as e:
+                    if e.status_code != 429:
+                        raise
+                    print(f"⏳ No free slot while {session.filename} was uploading, processing it now")
+                except UploadStalled:
+                    print(f"⏸️ Upload of {session.filename} stalled, processing it now")
+                except Exception as e:
+                    # Typically a container ffmpeg cannot read from a pipe
+                    print(f"⚠️ Early decode of {session.filename} failed ({e}), processing the full file")
+
+            if result is not None:
+                await asyncio.to_thread(self._index_early_outputs, session)
+            else:
+                result = await run_pipeline(
+                    self.jobs.executor, session.path, session.filename, self.output_dir,
+                    cache=self.jobs.cache, content_hash=actual, tier=session.tier,
+                    renderer=self.jobs.renderer, trace=session.trace, output_id=session.id,
+                    index=self.jobs.index, admission=self.jobs.admission, admission_wait=math.inf,
+                )
+            status = 200
+            return result
+        except PipelineError as e:
+            status = e.status_code
+            raise
+        finally:
+            session.close()
+            session.trace.finish(status)
+
+    def _index_early_outputs(self, session: UploadSession):
+        record = load_notes(self.output_dir, session.id)
+        if record:
+            index_notes(self.jobs.index, session.id, record["filename"], record["notes"], record["segments"])
+
+    async def _drop_early_outputs(self, session: UploadSession):
+        """Delete notes an early start produced from bytes that failed the hash check"""
+        if not session.early:
+            return
+        await asyncio.gather(session.early, return_exceptions=True)
+        # Notes first, so nothing new can render from them; then settle a
+        # background render already scheduled before its PDF is removed.
+        self._remove(notes_path(self.output_dir, session.id))
+        await self.jobs.renderer.cancel(self.output_dir, session.id)
+        self._remove(pdf_path(self.output_dir, session.id))
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def prune(self):
+        """Discard sessions untouched for UPLOAD_TTL_SECONDS (run by the sweeper too)"""
+        cutoff = time.time() - UPLOAD_TTL_SECONDS
+        for session in list(self.sessions.values()):
+            if session.updated_at < cutoff:
+                self.discard(session)
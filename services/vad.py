@@ -0,0 +1,181 @@
+"""Energy-based voice activity detection in front of the recognizer.
+
+Audio is scored in VAD_FRAME_SECONDS frames (vectorized with NumPy). A
+frame is speech when it is VAD_MARGIN_DB above the noise floor, the 10th
+percentile of the last VAD_NOISE_WINDOW_SECONDS of frames; the threshold is
+clamped to [VAD_MIN_DBFS, VAD_MAX_DBFS] so a recording that starts mid-
+sentence or is nearly digital silence still classifies sensibly. Lower
+NOTEIFY_VAD_MAX_DBFS for quiet recordings whose speech stays under -40 dBFS.
+
+Silences longer than VAD_MIN_GAP_SECONDS are not sent to the recognizer.
+VAD_PADDING_SECONDS of each is kept on both sides of the speech around it,
+and the rest is replaced by a frame count so recognizers keep the
+recording's original timestamps (see LiveRecognizer.skip).
+"""
+import os
+import wave
+from typing import Iterable, Iterator, List, Union
+
+import numpy as np
+
+VAD_ENABLED = os.getenv("NOTEIFY_VAD", "1") == "1"
+VAD_FRAME_SECONDS = 0.03
+VAD_MARGIN_DB = float(os.getenv("NOTEIFY_VAD_MARGIN_DB", "10"))
+VAD_MIN_DBFS = float(os.getenv("NOTEIFY_VAD_MIN_DBFS", "-60"))
+VAD_MAX_DBFS = float(os.getenv("NOTEIFY_VAD_MAX_DBFS", "-40"))
+VAD_NOISE_WINDOW_SECONDS = 10.0
+VAD_PADDING_SECONDS = float(os.getenv("NOTEIFY_VAD_PADDING", "0.3"))
+VAD_MIN_GAP_SECONDS = float(os.getenv("NOTEIFY_VAD_MIN_GAP", "1.0"))
+VAD_MIN_SPEECH_SECONDS = 0.2
+
+# Chunks yielded by SpeechGate: PCM bytes, or a number of frames skipped
+Chunk = Union[bytes, int]
+
+
+def frame_rms(samples: np.ndarray, frame_len: int) -> np.ndarray:
+    """RMS per complete ``frame_len``-sample frame"""
+    usable = len(samples) - len(samples) % frame_len
+    frames = samples[:usable].astype(np.float32).reshape(-1, frame_len)
+    return np.sqrt(np.mean(frames * frames, axis=1))
+
+
+def to_dbfs(rms: np.ndarray) -> np.ndarray:
+    return 20 * np.log10(np.maximum(rms, 1.0) / 32768.0)
+
+
+def speech_threshold(noise_db: float) -> float:
+    return float(np.clip(noise_db + VAD_MARGIN_DB, VAD_MIN_DBFS, VAD_MAX_DBFS))
+
+
+def wav_has_speech(wav_path: str) -> bool:
+    """Quick whole-file check, run before any recognition"""
+    with wave.open(wav_path, "rb") as wf:
+        if wf.getsampwidth() != 2 or wf.getnchannels() != 1:
+            return True  # not something we can score; let the recognizer decide
+        frame_len = max(int(wf.getframerate() * VAD_FRAME_SECONDS), 1)
+        block_frames = frame_len * 1000
+
+        levels = []
+        while True:
+            data = wf.readframes(block_frames)
+            if len(data) < frame_len * 2:
+                break
+            levels.append(to_dbfs(frame_rms(np.frombuffer(data, dtype="<i2"), frame_len)))
+
+    if not levels:
+        return False
+    db = np.concatenate(levels)
+    threshold = speech_threshold(float(np.percentile(db, 10)))
+    return np.count_nonzero(db > threshold) * VAD_FRAME_SECONDS >= VAD_MIN_SPEECH_SECONDS
+
+
+class SpeechGate:
+    """Streams 16-bit mono PCM through, cutting long silences out.
+
+    :meth:`process` and :meth:`flush` return PCM bytes to recognize and
+    ints (frames skipped) in stream order; the ints always add up to the
+    audio that was not passed on.
+    """
+
+    def __init__(self, rate: int = 16000):
+        self.frame_len = max(int(rate * VAD_FRAME_SECONDS), 1)
+        frame_bytes = self.frame_len * 2
+        self.pad_bytes = int(VAD_PADDING_SECONDS / VAD_FRAME_SECONDS) * frame_bytes
+        self.gap_bytes = int(VAD_MIN_GAP_SECONDS / VAD_FRAME_SECONDS) * frame_bytes
+        self.window = int(VAD_NOISE_WINDOW_SECONDS / VAD_FRAME_SECONDS)
+
+        self._rest = b""              # incomplete analysis frame
+        self._levels = np.zeros(0)    # recent frame levels (dBFS) for the noise floor
+        self._pending = bytearray()   # silence since the last speech (after post-roll)
+        self._post_left = 0           # post-roll bytes still to pass after speech
+        self._cutting = False
+        self._skipped = 0             # frames cut from the current silence, not yet reported
+        self.frames_in = 0
+        self.frames_skipped = 0
+
+    def _speech(self, data: bytes, out: List[Chunk]):
+        if self._skipped:
+            out.append(self._skipped)
+            self._skipped = 0
+        if self._pending:
+            out.append(bytes(self._pending))  # pre-roll (or a gap too short to cut)
+            self._pending.clear()
+        self._cutting = False
+        out.append(data)
+        self._post_left = self.pad_bytes
+
+    def _silence(self, data: bytes, out: List[Chunk]):
+        post = min(self._post_left, len(data))
+        if post:
+            out.append(data[:post])
+            self._post_left -= post
+        self._pending += data[post:]
+
+        if len(self._pending) > self.gap_bytes + self.pad_bytes:
+            self._cutting = True
+        if self._cutting and len(self._pending) > self.pad_bytes:
+            cut = len(self._pending) - self.pad_bytes
+            self._skipped += cut // 2
+            self.frames_skipped += cut // 2
+            del self._pending[:cut]
+
+    @staticmethod
+    def _coalesce(out: List[Chunk]) -> List[Chunk]:
+        merged: List[Chunk] = []
+        for item in out:
+            if merged and isinstance(item, bytes) and isinstance(merged[-1], bytes):
+                merged[-1] += item
+            elif item:
+                merged.append(item)
+        return merged
+
+    def process(self, data: bytes) -> List[Chunk]:
+        data = self._rest + data
+        usable = len(data) - len(data) % (self.frame_len * 2)
+        self._rest = data[usable:]
+        if not usable:
+            return []
+        self.frames_in += usable // 2
+
+        levels = to_dbfs(frame_rms(np.frombuffer(data[:usable], dtype="<i2"), self.frame_len))
+        self._levels = np.concatenate([self._levels, levels])[-self.window:]
+        speech = levels > speech_threshold(float(np.percentile(self._levels, 10)))
+
+        # Handle runs of equal frames rather than frame by frame
+        out: List[Chunk] = []
+        bounds = [0, *(np.flatnonzero(np.diff(speech)) + 1), len(speech)]
+        step = self.frame_len * 2
+        for lo, hi in zip(bounds, bounds[1:]):
+            run = data[lo * step:hi * step]
+            if speech[lo]:
+                self._speech(run, out)
+            else:
+                self._silence(run, out)
+        return self._coalesce(out)
+
+    def flush(self) -> List[Chunk]:
+        """End of stream: pass the partial frame and report trailing silence"""
+        out: List[Chunk] = []
+        if self._rest:
+            self.frames_in += len(self._rest) // 2
+            self._silence(self._rest, out)
+            self._rest = b""
+        # Trailing silence is never recognized, only accounted for
+        trailing = self._skipped + len(self._pending) // 2
+        self.frames_skipped += len(self._pending) // 2
+        self._skipped = 0
+        self._pending.clear()
+        out.append(trailing)
+        return self._coalesce(out)
+
+
+def gate_chunks(chunks: Iterable[bytes], rate: int = 16000) -> Iterator[Chunk]:
+    """Run PCM chunks through a SpeechGate (see module docstring)"""
+    gate = SpeechGate(rate)
+    for data in chunks:
+        yield from gate.process(data)
+    yield from gate.flush()
+
+    if gate.frames_in:
+        share = gate.frames_skipped / gate.frames_in
+        print(f"🔇 VAD skipped {gate.frames_skipped / rate:.1f}s of {gate.frames_in / rate:.1f}s ({share:.0%})")
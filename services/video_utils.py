@@ -1,15 +1,69 @@
 import subprocess
 import os
+import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+# ffmpeg gets EXTRACT_TIMEOUT seconds plus EXTRACT_SECONDS_PER_MINUTE for
+# every minute of media, so long lectures are not cut off at a fixed limit.
+EXTRACT_TIMEOUT = float(os.getenv("NOTEIFY_EXTRACT_TIMEOUT", "60"))
+EXTRACT_SECONDS_PER_MINUTE = float(os.getenv("NOTEIFY_EXTRACT_SECONDS_PER_MINUTE", "20"))
+# Budget when the duration cannot be probed, so a stuck ffmpeg still ends
+EXTRACT_MAX_TIMEOUT = float(os.getenv("NOTEIFY_EXTRACT_MAX_TIMEOUT", "3600"))
+
+# Long-lecture mode: inputs longer than LONG_INPUT_SECONDS are extracted as
+# LONG_SEGMENT_SECONDS slices, EXTRACT_WORKERS ffmpeg processes at a time.
+LONG_INPUT_SECONDS = float(os.getenv("NOTEIFY_LONG_INPUT_SECONDS", "1800"))
+LONG_SEGMENT_SECONDS = float(os.getenv("NOTEIFY_LONG_SEGMENT_SECONDS", "600"))
+EXTRACT_WORKERS = int(os.getenv("NOTEIFY_EXTRACT_WORKERS", "2"))
+# Each slice runs this far into the next one; the transcriber cuts between
+# them at the quietest point of the overlap instead of mid-word
+SLICE_OVERLAP_SECONDS = 10.0
+
+_DURATION_RE = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+
+
+def probe_duration(path: str) -> Optional[float]:
+    """Media duration in seconds, or None if it cannot be determined"""
+    try:
+        result = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+             '-of', 'default=noprint_wrappers=1:nokey=1', path],
+            capture_output=True, text=True, timeout=30
+        )
+        return float(result.stdout.strip())
+    except FileNotFoundError:
+        pass  # no ffprobe; ffmpeg prints the duration in its banner
+    except (ValueError, subprocess.TimeoutExpired):
+        return None
+
+    try:
+        result = subprocess.run(['ffmpeg', '-hide_banner', '-i', path],
+                                capture_output=True, text=True, timeout=30)
+    except (FileNotFoundError, subprocess.TimeoutExpired):
+        return None
+    match = _DURATION_RE.search(result.stderr)
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def extract_timeout(duration: Optional[float]) -> float:
+    """ffmpeg time budget for ``duration`` seconds of media (None = unknown)"""
+    if duration is None:
+        return EXTRACT_MAX_TIMEOUT
+    return EXTRACT_TIMEOUT + EXTRACT_SECONDS_PER_MINUTE * duration / 60
 
 
 def extract_audio_from_video(video_path: str) -> str:
     """Extract audio from video using system FFmpeg - NO PYTHON PACKAGE NEEDED"""
     audio_path = video_path.rsplit(".", 1)[0] + ".mp3"
-    
+
     # ✅ Use system FFmpeg directly (most reliable)
     cmd = [
-        'ffmpeg', 
+        'ffmpeg',
         '-i', video_path,
         '-vn',           # No video
         '-acodec', 'mp3',
@@ -18,23 +72,98 @@ def extract_audio_from_video(video_path: str) -> str:
         '-y',            # Overwrite
         audio_path
     ]
-    
+
     try:
+        timeout = extract_timeout(probe_duration(video_path))
         print(f"🎥 Running FFmpeg: {' '.join(cmd)}")
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
-        
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+
         if result.returncode != 0:
             raise RuntimeError(f"FFmpeg failed: {result.stderr}")
-        
+
         if not os.path.exists(audio_path):
             raise RuntimeError("FFmpeg created no output file")
-        
+
         print(f"✅ Audio extracted: {audio_path}")
         return audio_path
-        
+
     except subprocess.TimeoutExpired:
-        raise RuntimeError("FFmpeg timeout - video too long")
+        raise RuntimeError(f"FFmpeg timeout after {timeout:.0f}s")
     except FileNotFoundError:
         raise RuntimeError("❌ FFmpeg not found! Install from https://ffmpeg.org/download.html")
     except Exception as e:
-        raise RuntimeError(f"Video extraction failed: {e}")
\ No newline at end of file
+        raise RuntimeError(f"Video extraction failed: {e}")
+
+
+def extract_slice(input_path: str, start: float, length: float, output_path: str) -> str:
+    """Decode [start, start + length) of any input to a 16 kHz mono WAV"""
+    cmd = [
+        'ffmpeg',
+        '-ss', f"{start:.3f}",   # before -i: seek the input instead of decoding up to it
+        '-t', f"{length:.3f}",
+        '-i', input_path,
+        '-vn',
+        '-acodec', 'pcm_s16le',
+        '-ac', '1',
+        '-ar', '16000',
+        '-y',
+        output_path
+    ]
+    timeout = extract_timeout(length)
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        raise RuntimeError(f"FFmpeg timeout after {timeout:.0f}s on slice at {start:.0f}s")
+    except FileNotFoundError:
+        raise RuntimeError("❌ FFmpeg not found! Install from https://ffmpeg.org/download.html")
+
+    if result.returncode != 0 or not os.path.exists(output_path):
+        raise RuntimeError(f"FFmpeg failed on slice at {start:.0f}s: {result.stderr}")
+    return output_path
+
+
+def slice_ranges(duration: float, segment_seconds: float = LONG_SEGMENT_SECONDS) -> List[Tuple[float, float]]:
+    ranges = []
+    start = 0.0
+    while start < duration:
+        length = min(segment_seconds, duration - start)
+        ranges.append((start, length))
+        start += length
+    return ranges
+
+
+def iter_slices(input_path: str, duration: float,
+                segment_seconds: float = LONG_SEGMENT_SECONDS,
+                workers: int = EXTRACT_WORKERS) -> Iterator[Tuple[float, str]]:
+    """Yield (offset seconds, WAV path) for each slice, in order, as soon as
+    it is extracted. Every slice but the last also holds the first
+    SLICE_OVERLAP_SECONDS of the next one. At most ``workers`` slices are
+    decoded ahead of the consumer; the consumer owns (and should delete)
+    each yielded file."""
+    base = input_path.rsplit(".", 1)[0]
+    ranges = slice_ranges(duration, segment_seconds)
+    print(f"🎞️ Long input ({duration / 60:.0f} min): extracting {len(ranges)} slices")
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="noteify-extract")
+    futures = []
+    yielded = 0
+    try:
+        for i, (start, _) in enumerate(ranges):
+            while len(futures) < len(ranges) and len(futures) <= i + workers:
+                n = len(futures)
+                s, length = ranges[n]
+                if n + 1 < len(ranges):
+                    length += SLICE_OVERLAP_SECONDS
+                futures.append(pool.submit(extract_slice, input_path, s, length, f"{base}.part{n:04d}.wav"))
+            path = futures[i].result()
+            yielded = i + 1
+            yield start, path
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        # Slices the consumer never received (error or early exit)
+        for future in futures[yielded:]:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                try:
+                    os.remove(future.result())
+                except OSError:
+                    pass
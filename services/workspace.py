@@ -0,0 +1,134 @@
+import os
+import re
+import shutil
+import sqlite3
+import time
+import uuid
+from typing import Dict, List, Optional
+
+# Intermediates (the upload, extracted MP3, WAV, long-input slices) live in
+# one scratch directory per job under WORK_DIR; point it at a tmpfs such as
+# /dev/shm/noteify to keep them off the disk.
+WORK_DIR = os.getenv("NOTEIFY_WORK_DIR")
+
+# Outputs (notes JSON, PDFs, batch ZIPs) are deleted OUTPUT_TTL_SECONDS after
+# they were last written, and the oldest go first once the output directory
+# grows past OUTPUT_QUOTA_MB (0 = no cap). The sweeper runs every
+# SWEEP_INTERVAL_SECONDS and never touches anything younger than SWEEP_GRACE_SECONDS.
+OUTPUT_TTL_SECONDS = int(os.getenv("NOTEIFY_OUTPUT_TTL", "86400"))
+OUTPUT_QUOTA_MB = int(os.getenv("NOTEIFY_OUTPUT_QUOTA_MB", "2048"))
+SWEEP_INTERVAL_SECONDS = int(os.getenv("NOTEIFY_SWEEP_INTERVAL", "300"))
+SWEEP_GRACE_SECONDS = 300
+
+_OUTPUT_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+def new_output_id() -> str:
+    return uuid.uuid4().hex
+
+
+def is_output_id(value: str) -> bool:
+    return bool(_OUTPUT_ID_RE.match(value))
+
+
+class Workspace:
+    """Scratch directory of one job; removed with everything in it on close"""
+
+    def __init__(self, root: str, job_id: str):
+        self.id = job_id
+        self.dir = os.path.join(root, job_id)
+        os.makedirs(self.dir, exist_ok=True)
+
+    def path(self, filename: str) -> str:
+        return os.path.join(self.dir, os.path.basename(filename))
+
+    def close(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class Workspaces:
+    """Per-job scratch directories plus TTL/quota garbage collection of outputs.
+
+    Swept outputs are also removed from the search ``index`` (a
+    services.search.SearchIndex) when one is given.
+    """
+
+    def __init__(self, output_dir: str, work_dir: Optional[str] = None,
+                 ttl: int = OUTPUT_TTL_SECONDS, quota_mb: int = OUTPUT_QUOTA_MB, index=None):
+        self.output_dir = output_dir
+        self.index = index
+        self.work_dir = work_dir or WORK_DIR or os.path.join(output_dir, ".work")
+        self.ttl = ttl
+        self.quota_bytes = quota_mb * 1024 * 1024
+        os.makedirs(self.output_dir, exist_ok=True)
+        os.makedirs(self.work_dir, exist_ok=True)
+
+    def create(self, job_id: Optional[str] = None) -> Workspace:
+        return Workspace(self.work_dir, job_id or new_output_id())
+
+    def _output_groups(self) -> List[Dict]:
+        """Output files grouped by id (the name up to the first dot)"""
+        groups: Dict[str, Dict] = {}
+        with os.scandir(self.output_dir) as entries:
+            for entry in entries:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                except FileNotFoundError:
+                    continue
+                stem = entry.name.split(".", 1)[0]
+                group = groups.setdefault(stem, {"id": stem, "paths": [], "bytes": 0, "mtime": 0.0})
+                group["paths"].append(entry.path)
+                group["bytes"] += stat.st_size
+                group["mtime"] = max(group["mtime"], stat.st_mtime)
+        return sorted(groups.values(), key=lambda g: g["mtime"])
+
+    def sweep(self, now: Optional[float] = None) -> Dict[str, int]:
+        """Delete expired outputs, then the oldest ones while over quota"""
+        now = now or time.time()
+        removed_outputs = removed_bytes = removed_scratch = 0
+
+        groups = self._output_groups()
+        total = sum(g["bytes"] for g in groups)
+        for group in groups:
+            age = now - group["mtime"]
+            expired = age > self.ttl
+            over_quota = self.quota_bytes and total > self.quota_bytes
+            if age < SWEEP_GRACE_SECONDS or not (expired or over_quota):
+                continue
+            for path in group["paths"]:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            if self.index and is_output_id(group["id"]):
+                try:
+                    self.index.remove(group["id"])
+                except sqlite3.Error as e:
+                    print(f"⚠️ Could not remove {group['id']} from the search index: {e}")
+            total -= group["bytes"]
+            removed_outputs += 1
+            removed_bytes += group["bytes"]
+
+        # Scratch directories left behind by a crash or a killed worker
+        with os.scandir(self.work_dir) as entries:
+            for entry in entries:
+                try:
+                    stale = now - entry.stat(follow_symlinks=False).st_mtime > self.ttl
+                except FileNotFoundError:
+                    continue
+                if stale and entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    removed_scratch += 1
+
+        if removed_outputs or removed_scratch:
+            print(f"🧹 Swept {removed_outputs} outputs ({removed_bytes / 1024 / 1024:.1f} MB) "
+                  f"and {removed_scratch} stale workspaces")
+        return {"outputs": removed_outputs, "bytes": removed_bytes, "workspaces": removed_scratch}
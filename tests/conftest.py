@@ -0,0 +1,5 @@
+import os
+
+# Run against the deterministic fake recognizer; no model download needed.
+os.environ.setdefault("NOTEIFY_ASR_BACKEND", "stub")
+os.environ.setdefault("NOTEIFY_MODEL_LOAD", "lazy")
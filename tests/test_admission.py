@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from services.admission import AdmissionController, Cost
+from services.pipeline import PipelineError
+
+LECTURE = Cost(3600, "accurate", "probe")
+CLIP = Cost(60, "accurate", "probe")
+
+
+def _controller() -> AdmissionController:
+    # One slot for long recordings, one reserved for the fast lane
+    return AdmissionController(max_active=2, memory_mb=100000, fast_lane_slots=1, enabled=True)
+
+
+def test_admits_while_there_is_room():
+    async def run():
+        admission = _controller()
+        ticket = await admission.acquire(LECTURE)
+        assert admission.active == [ticket]
+        admission.release(ticket)
+        assert admission.active == []
+
+    asyncio.run(run())
+
+
+def test_queues_until_a_slot_is_released():
+    async def run():
+        admission = _controller()
+        first = await admission.acquire(LECTURE)
+        waiting = asyncio.create_task(admission.acquire(LECTURE, max_wait=float("inf")))
+        await asyncio.sleep(0)
+        assert not waiting.done()
+        assert admission.stats()["queued_regular"] == 1
+
+        admission.release(first)
+        second = await asyncio.wait_for(waiting, 1)
+        assert admission.active == [second]
+
+    asyncio.run(run())
+
+
+def test_fast_lane_is_not_blocked_by_long_recordings():
+    async def run():
+        admission = _controller()
+        await admission.acquire(LECTURE)
+        assert not admission.has_room(LECTURE)
+        assert admission.has_room(CLIP)
+        clip = await asyncio.wait_for(admission.acquire(CLIP), 1)
+        assert clip.lane == "fast"
+        assert len(admission.active) == 2
+
+    asyncio.run(run())
+
+
+def test_rejects_with_retry_after_when_the_wait_is_too_long():
+    async def run():
+        admission = _controller()
+        await admission.acquire(LECTURE)
+        with pytest.raises(PipelineError) as e:
+            await admission.acquire(LECTURE, max_wait=10)
+        assert e.value.status_code == 429
+        retry_after = int(e.value.headers["Retry-After"])
+        assert 10 < retry_after <= 3600
+        assert admission.stats()["queued_regular"] == 0
+
+        with pytest.raises(PipelineError):
+            admission.check(LECTURE, max_wait=10)
+
+    asyncio.run(run())
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services import batch as batch_module
+from services.admission import AdmissionController
+from services.batch import BatchManager
+from services.jobs import JobManager
+from services.outputs import save_notes
+from services.pipeline import PipelineError
+from services.workspace import Workspaces
+
+NOTES = {
+    "full_transcription": ["Eigenvalues of a symmetric matrix are real."],
+    "summary": {"paragraph": "Symmetric matrices have real eigenvalues."},
+}
+SEGMENTS = [{"start": 0.0, "end": 3.0, "text": "eigenvalues of a symmetric matrix are real"}]
+
+
+async def _fake_pipeline(executor, input_path, filename, output_dir, output_id=None, **kwargs):
+    await asyncio.sleep(0.01)
+    if filename == "silence.wav":
+        raise PipelineError(422, "No speech detected in audio")
+    save_notes(output_dir, output_id, NOTES, SEGMENTS, filename)
+    return {"output_id": output_id, "filename": filename}
+
+
+@pytest.fixture
+def setup(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_module, "run_pipeline", _fake_pipeline)
+    output_dir = str(tmp_path / "outputs")
+    os.makedirs(output_dir)
+    executor = ThreadPoolExecutor(2)
+    jobs = JobManager(executor, admission=AdmissionController(enabled=False))
+    yield BatchManager(jobs, parallelism=2), Workspaces(output_dir, str(tmp_path / "work")), output_dir
+    executor.shutdown()
+
+
+def _new_batch(manager: BatchManager, workspaces: Workspaces):
+    batch = manager.create("fast")
+    for filename in ("week1.wav", "silence.wav", "week1.wav"):
+        workspace = workspaces.create()
+        batch.add(filename, workspace, workspace.path(filename), None)
+    return batch
+
+
+def test_manifest_streams_every_file_then_a_summary(setup):
+    manager, workspaces, output_dir = setup
+
+    async def run():
+        batch = _new_batch(manager, workspaces)
+        manager.start(batch, output_dir)
+        return [entry async for entry in manager.manifest(batch)]
+
+    header, *files, summary = asyncio.run(run())
+    assert header["type"] == "batch" and header["files"] == 3
+    assert sorted(entry["index"] for entry in files) == [0, 1, 2]
+    failed = [entry for entry in files if entry["status"] == "failed"]
+    assert [entry["filename"] for entry in failed] == ["silence.wav"]
+    assert failed[0]["error"]["status_code"] == 422
+    assert summary["status"] == "completed"
+    assert (summary["completed"], summary["failed"]) == (2, 1)
+
+
+def test_batch_runs_without_a_manifest_reader(setup):
+    manager, workspaces, output_dir = setup
+
+    async def run():
+        batch = _new_batch(manager, workspaces)
+        manager.start(batch, output_dir)
+        await asyncio.gather(*batch.tasks)
+        await asyncio.sleep(0)
+        return batch
+
+    assert asyncio.run(run()).status == "completed"
+
+
+def test_zip_holds_each_pdf_and_the_manifest(setup):
+    manager, workspaces, output_dir = setup
+
+    async def run():
+        batch = _new_batch(manager, workspaces)
+        manager.start(batch, output_dir)
+        async for _ in manager.manifest(batch):
+            pass
+        return batch, await manager.build_zip(batch, output_dir)
+
+    batch, zip_path = asyncio.run(run())
+    with zipfile.ZipFile(zip_path) as zf:
+        assert sorted(zf.namelist()) == ["manifest.json", "week1 (2).pdf", "week1.pdf"]
+        assert zf.read("week1.pdf").startswith(b"%PDF")
+        manifest = json.loads(zf.read("manifest.json"))
+    assert manifest["batch_id"] == batch.id
+    assert [item["status"] for item in manifest["items"]] == ["completed", "failed", "completed"]
@@ -0,0 +1,29 @@
+from services.exporters import format_clock, to_srt, to_vtt
+
+SEGMENTS = [
+    {"start": 0.0, "end": 2.5, "text": "today we look at eigenvalues"},
+    {"start": 3661.0016, "end": 3662.9996, "text": "of a symmetric matrix"},
+]
+
+
+def test_srt_numbers_cues_with_comma_milliseconds():
+    assert to_srt(SEGMENTS) == (
+        "1\n00:00:00,000 --> 00:00:02,500\ntoday we look at eigenvalues\n"
+        "\n"
+        "2\n01:01:01,002 --> 01:01:03,000\nof a symmetric matrix\n"
+    )
+
+
+def test_vtt_has_header_and_dot_milliseconds():
+    assert to_vtt(SEGMENTS) == (
+        "WEBVTT\n"
+        "\n"
+        "00:00:00.000 --> 00:00:02.500\ntoday we look at eigenvalues\n"
+        "\n"
+        "01:01:01.002 --> 01:01:03.000\nof a symmetric matrix\n"
+    )
+
+
+def test_clock_drops_milliseconds():
+    assert format_clock(3599.9) == "00:59:59"
+    assert format_clock(36000) == "10:00:00"
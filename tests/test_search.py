@@ -0,0 +1,35 @@
+import os
+import time
+
+from services.outputs import notes_path, save_notes
+from services.search import SearchIndex
+from services.workspace import SWEEP_GRACE_SECONDS, Workspaces
+
+NOTES = {
+    "full_transcription": ["Eigenvalues of a symmetric matrix are real."],
+    "summary": {"paragraph": ""},
+}
+SEGMENTS = [{"start": 0.0, "end": 3.0, "text": "eigenvalues of a symmetric matrix are real"}]
+
+
+def _store(workspaces: Workspaces, index: SearchIndex, output_id: str):
+    save_notes(workspaces.output_dir, output_id, NOTES, SEGMENTS, f"{output_id}.wav")
+    index.add(output_id, f"{output_id}.wav", NOTES, SEGMENTS)
+
+
+def test_sweep_removes_swept_outputs_from_search(tmp_path):
+    index = SearchIndex(str(tmp_path / "search.db"))
+    workspaces = Workspaces(str(tmp_path / "outputs"), ttl=3600, quota_mb=0, index=index)
+    expired, kept = "a" * 32, "b" * 32
+    _store(workspaces, index, expired)
+    _store(workspaces, index, kept)
+
+    now = time.time()
+    old = now - 3600 - SWEEP_GRACE_SECONDS
+    os.utime(notes_path(workspaces.output_dir, expired), (old, old))
+    assert {hit["output_id"] for hit in index.search("eigenvalues")} == {expired, kept}
+
+    assert workspaces.sweep(now)["outputs"] == 1
+    assert not os.path.exists(notes_path(workspaces.output_dir, expired))
+    assert [hit["output_id"] for hit in index.search("eigenvalues")] == [kept]
+    assert index.search("eigenvalues", output_id=expired) == []
@@ -0,0 +1,24 @@
+import os
+import signal
+import time
+
+from services import speech_to_text
+
+
+def test_pool_is_reforked_after_a_worker_dies():
+    pool = speech_to_text.start_pool(2)
+    try:
+        victim = next(iter(pool._processes))
+        os.kill(victim, signal.SIGKILL)
+        deadline = time.time() + 10
+        while not pool._broken and time.time() < deadline:
+            time.sleep(0.05)
+        assert pool._broken
+
+        pid = speech_to_text._submit(2, os.getpid).result(timeout=10)
+        assert speech_to_text._pool is not pool
+        assert pid in speech_to_text._pool._processes
+    finally:
+        if speech_to_text._pool is not None:
+            speech_to_text._pool.shutdown()
+            speech_to_text._pool = None
@@ -0,0 +1,87 @@
+import asyncio
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services import uploads
+from services.admission import AdmissionController
+from services.jobs import JobManager
+from services.pipeline import PipelineError
+from services.uploads import UploadManager
+from services.workspace import Workspaces
+
+DATA = os.urandom(3000)
+
+
+async def _body(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads, "UPLOAD_EARLY_START", False)
+    output_dir = str(tmp_path / "outputs")
+    os.makedirs(output_dir)
+    executor = ThreadPoolExecutor(1)
+    jobs = JobManager(executor, admission=AdmissionController(enabled=False))
+    yield UploadManager(jobs, Workspaces(output_dir, str(tmp_path / "work")), output_dir)
+    executor.shutdown()
+
+
+def test_chunks_resume_from_the_server_offset(manager):
+    async def run():
+        session = manager.create("lecture.wav", len(DATA))
+        assert await session.write(0, _body(DATA[:1000])) == 1000
+
+        # A retried chunk overlapping what already landed is only appended from the offset
+        assert await session.write(500, _body(DATA[500:1500], DATA[1500:2000])) == 2000
+        with pytest.raises(PipelineError) as e:
+            await session.write(2500, _body(DATA[2500:]))
+        assert e.value.status_code == 409
+        assert session.to_dict()["offset"] == 2000
+
+        assert await session.write(2000, _body(DATA[2000:])) == len(DATA)
+        assert session.complete
+        with open(session.path, "rb") as f:
+            assert f.read() == DATA
+        assert session.digest.hexdigest() == hashlib.sha256(DATA).hexdigest()
+
+    asyncio.run(run())
+
+
+def test_chunk_past_the_declared_size_is_rejected(manager):
+    async def run():
+        session = manager.create("lecture.wav", 10)
+        with pytest.raises(PipelineError) as e:
+            await session.write(0, _body(DATA[:20]))
+        assert e.value.status_code == 413
+
+    asyncio.run(run())
+
+
+def test_sha256_mismatch_discards_the_upload(manager):
+    async def run():
+        session = manager.create("lecture.wav", len(DATA), sha256="0" * 64)
+        await session.write(0, _body(DATA))
+        with pytest.raises(PipelineError) as e:
+            await manager.finalize(session)
+        assert e.value.status_code == 422
+        assert manager.get(session.id) is None
+        assert not os.path.exists(session.path)
+
+    asyncio.run(run())
+
+
+def test_incomplete_upload_cannot_be_finalized(manager):
+    async def run():
+        session = manager.create("lecture.wav", len(DATA))
+        await session.write(0, _body(DATA[:100]))
+        with pytest.raises(PipelineError) as e:
+            await manager.finalize(session)
+        assert e.value.status_code == 409
+        assert manager.get(session.id) is session
+
+    asyncio.run(run())
@@ -0,0 +1,63 @@
+import numpy as np
+
+from services.vad import SpeechGate
+
+RATE = 16000
+
+
+def _recording() -> bytes:
+    """1 s of tone, 5 s of faint noise, 1 s of tone"""
+    rng = np.random.default_rng(0)
+    t = np.arange(RATE) / RATE
+    tone = (6000 * np.sin(2 * np.pi * 220 * t)).astype("<i2")
+    hiss = rng.integers(-20, 20, 5 * RATE).astype("<i2")
+    return np.concatenate([tone, hiss, tone]).tobytes()
+
+
+def _gate(data: bytes, chunk_bytes: int = 3001):
+    gate = SpeechGate(RATE)
+    out = []
+    for start in range(0, len(data), chunk_bytes):
+        out += gate.process(data[start:start + chunk_bytes])
+    out += gate.flush()
+    return gate, out
+
+
+def test_skipped_frames_account_for_all_cut_audio():
+    data = _recording()
+    gate, out = _gate(data)
+
+    passed = sum(len(item) // 2 for item in out if isinstance(item, bytes))
+    skipped = sum(item for item in out if isinstance(item, int))
+    assert skipped == gate.frames_skipped
+    assert passed + skipped == gate.frames_in == len(data) // 2
+
+    # The gap is cut down to the padding kept on either side of it (give or
+    # take the analysis frame each tone edge falls in)
+    kept, pad = 5 * RATE - skipped, gate.pad_bytes // 2
+    assert abs(kept - 2 * pad) <= 2 * gate.frame_len
+
+
+def test_passed_audio_keeps_its_original_position():
+    data = _recording()
+    _, out = _gate(data)
+
+    position = 0
+    for item in out:
+        if isinstance(item, int):
+            position += item
+        else:
+            assert item == data[position * 2:position * 2 + len(item)]
+            position += len(item) // 2
+    assert position == len(data) // 2
+
+    # Both tones reach the recognizer in full, either side of a single cut
+    runs = [b""]
+    for item in out:
+        if isinstance(item, int):
+            runs.append(b"")
+        else:
+            runs[-1] += item
+    first, second = [run for run in runs if run]
+    assert first.startswith(data[:RATE * 2])
+    assert second.endswith(data[-RATE * 2:])